@@ -0,0 +1,60 @@
+"""Benchmarks of the connection management hot paths, run against a mock Archicad server.
+
+python -m benchmarks --instances 1 5 21 --repeat 20
+python -m benchmarks --save-baseline
+python -m benchmarks --tolerance 0.2    # fails if any p50 is more than 20% slower than the baseline
+
+Timings depend on the machine, so the baseline is not part of the repository. Save it on the machine that runs the
+comparison, from the commit to compare against, with the same --instances, --repeat and --latency.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.runner import BenchmarkResult, compare_to_baseline, mock_archicad, save_baseline
+from benchmarks.scenarios import SCENARIOS
+from multiconn_archicad import MultiConn
+
+DEFAULT_BASELINE: Path = Path(__file__).parent / "baselines" / "baseline.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 5, 21])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS.keys()), default=list(SCENARIOS.keys()))
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock waits before each response")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results: list[BenchmarkResult] = []
+    for instances in args.instances:
+        ports = MultiConn._port_range[:instances]
+        with mock_archicad(ports, args.latency):
+            for scenario in args.scenarios:
+                result = SCENARIOS[scenario](ports, args.repeat)
+                print(result)
+                results.append(result)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif not args.baseline.exists():
+        print(
+            f"WARNING no baseline at {args.baseline}, the results were not compared. "
+            "Save one from the commit to compare against with: python -m benchmarks --save-baseline",
+            file=sys.stderr,
+        )
+    else:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Overhead of the request hooks on the dispatch of commands.
+
+Measures a burst of IsAlive commands against the mock server without hooks, with a no-op before and after hook, and
+with an async one, and the cost of the dispatch itself (the path of CoreCommands._send around the request) without
+the network.
+
+    python -m benchmarks.hooks --commands 2000 --repeat 20
+"""
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, cast
+
+from benchmarks.runner import measure
+from multiconn_archicad import CoreCommands, Port
+from multiconn_archicad.hooks import RequestHooks, RequestInfo
+from multiconn_archicad.testing import MockArchicadServer
+from multiconn_archicad.utilities.async_utils import run_in_sync_or_async_context
+
+PORT = Port(19723)
+
+
+def no_op_hooks() -> RequestHooks:
+    hooks = RequestHooks()
+    hooks.add_before(lambda info: None)
+    hooks.add_after(lambda info, result: None)
+    return hooks
+
+
+def async_hooks() -> RequestHooks:
+    async def before(info: RequestInfo) -> None:
+        pass
+
+    async def after(info: RequestInfo, result: Any) -> None:
+        pass
+
+    hooks = RequestHooks()
+    hooks.add_before(before)
+    hooks.add_after(after)
+    return hooks
+
+
+def report(name: str, operations: int, samples: list[float]) -> None:
+    samples = sorted(samples)
+    per_operation = samples[len(samples) // 2] / operations
+    print(f"{name:<40} p50 {samples[len(samples) // 2] * 1e3:9.2f} ms  {per_operation * 1e6:8.2f} us/command")
+
+
+# The dispatch of CoreCommands with the request replaced by a coroutine that returns immediately. Without hooks, the
+# bypass calls the request directly, so the difference is the cost of checking for hooks.
+def dispatch(core: CoreCommands, commands: int, bypass: bool = False) -> Callable[[], object]:
+
+    async def send(name: str, data: bytes, priority: Any) -> dict[str, Any]:
+        return {"succeeded": True}
+
+    core._send_with_retries = send  # type: ignore[method-assign]
+
+    function = core._send_with_retries if bypass else core._send
+
+    async def burst() -> None:
+        for _ in range(commands):
+            await function("API.IsAlive", b"{}", None)  # type: ignore[arg-type]
+
+    return lambda: asyncio.run(burst())
+
+
+def round_trip(core: CoreCommands, commands: int) -> Callable[[], object]:
+
+    async def burst() -> None:
+        await asyncio.gather(
+            *(cast(Awaitable[dict[str, Any]], core.post_command("API.IsAlive")) for _ in range(commands))
+        )
+
+    return lambda: run_in_sync_or_async_context(burst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    variants = {"no hooks": RequestHooks, "no-op hooks": no_op_hooks, "async no-op hooks": async_hooks}
+    report("dispatch, bypassed", args.commands, measure(dispatch(CoreCommands(PORT), args.commands, True), args.repeat))
+    for name, create_hooks in variants.items():
+        core = CoreCommands(PORT, hooks=create_hooks())
+        report(f"dispatch, {name}", args.commands, measure(dispatch(core, args.commands), args.repeat))
+    with MockArchicadServer(ports=[PORT]):
+        for name, create_hooks in variants.items():
+            core = CoreCommands(PORT, hooks=create_hooks())
+            report(f"round trip, {name}", args.commands, measure(round_trip(core, args.commands), args.repeat))
+            core.close()
+
+
+if __name__ == "__main__":
+    main()
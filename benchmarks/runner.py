@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from multiconn_archicad import Port
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    instances: int
+    samples: int
+    operations: int
+    p50: float
+    p90: float
+    p99: float
+    mean: float
+    throughput: float
+
+    @classmethod
+    def from_samples(cls, name: str, instances: int, samples: list[float], operations: int) -> "BenchmarkResult":
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+        return cls(
+            name=name,
+            instances=instances,
+            samples=len(samples),
+            operations=operations,
+            p50=quantiles[49],
+            p90=quantiles[89],
+            p99=quantiles[98],
+            mean=statistics.fmean(samples),
+            throughput=operations * len(samples) / sum(samples),
+        )
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.instances}]"
+
+    def __str__(self) -> str:
+        return (
+            f"{self.key:<36} p50 {self.p50 * 1e3:9.2f} ms  p90 {self.p90 * 1e3:9.2f} ms  "
+            f"p99 {self.p99 * 1e3:9.2f} ms  {self.throughput:10.1f} ops/s"
+        )
+
+
+# Runs the function repeat times after warmup runs, and returns the duration of each run in seconds.
+# The output of the measured code is discarded, so printing does not distort the report.
+def measure(function: Callable[[], object], repeat: int, warmup: int = 1) -> list[float]:
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            function()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def is_listening(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+# The mock runs in its own process, so it does not compete with the measured code for the GIL
+@contextlib.contextmanager
+def mock_archicad(ports: list[Port], latency: float = 0.0, timeout: float = 30.0) -> Iterator[None]:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "multiconn_archicad.testing", "--latency", str(latency), "--ports"]
+        + [str(port) for port in ports],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.perf_counter() + timeout
+        while not all(is_listening(port) for port in ports):
+            if time.perf_counter() > deadline or process.poll() is not None:
+                raise RuntimeError("Mock Archicad server did not start")
+            time.sleep(0.05)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def save_baseline(results: list[BenchmarkResult], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({result.key: asdict(result) for result in results}, indent=2))
+
+
+# Returns a message for every result whose p50 is slower than the baseline by more than the tolerance. Results
+# missing from the baseline are reported as warnings, as they were not compared.
+def compare_to_baseline(results: list[BenchmarkResult], path: Path, tolerance: float) -> list[str]:
+    baseline = json.loads(path.read_text())
+    regressions = []
+    for result in results:
+        if result.key not in baseline:
+            print(f"WARNING {result.key} is not in the baseline {path}, it was not compared", file=sys.stderr)
+        else:
+            reference = baseline[result.key]["p50"]
+            if result.p50 > reference * (1 + tolerance):
+                regressions.append(
+                    f"{result.key}: p50 {result.p50 * 1e3:.2f} ms is {result.p50 / reference - 1:.0%} slower "
+                    f"than the baseline {reference * 1e3:.2f} ms"
+                )
+    return regressions
@@ -0,0 +1,111 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, cast
+
+from benchmarks.runner import BenchmarkResult, measure
+from multiconn_archicad import ConnHeader, CoreCommands, MultiConn, Port
+from multiconn_archicad.utilities.async_utils import run_in_sync_or_async_context
+
+
+def multi_conn_init(ports: list[Port], repeat: int) -> BenchmarkResult:
+    def create() -> None:
+        MultiConn().close()
+
+    return BenchmarkResult.from_samples("MultiConn()", len(ports), measure(create, repeat), 1)
+
+
+def multi_conn_lazy_init(ports: list[Port], repeat: int) -> BenchmarkResult:
+    def create() -> None:
+        MultiConn(lazy=True).close()
+
+    return BenchmarkResult.from_samples("MultiConn(lazy)", len(ports), measure(create, repeat), 1)
+
+
+def multi_conn_lazy_primary(ports: list[Port], repeat: int) -> BenchmarkResult:
+    def create() -> None:
+        conn = MultiConn(lazy=True)
+        conn.primary = ports[0]
+        conn.close()
+
+    return BenchmarkResult.from_samples("MultiConn(lazy).primary", len(ports), measure(create, repeat), 1)
+
+
+def multi_conn_create(ports: list[Port], repeat: int) -> BenchmarkResult:
+    async def create() -> None:
+        conn = await MultiConn.create()
+        await cast(Awaitable[None], conn.close())
+
+    return BenchmarkResult.from_samples(
+        "MultiConn.create", len(ports), measure(lambda: run_in_sync_or_async_context(create), repeat), 1
+    )
+
+
+def refresh_all_ports(ports: list[Port], repeat: int) -> BenchmarkResult:
+    with MultiConn() as conn:
+        return BenchmarkResult.from_samples("Refresh.all_ports", len(ports), measure(conn.refresh.all_ports, repeat), 1)
+
+
+def refresh_all_ports_incremental(ports: list[Port], repeat: int) -> BenchmarkResult:
+    with MultiConn() as conn:
+        return BenchmarkResult.from_samples(
+            "Refresh.all_ports(incremental)",
+            len(ports),
+            measure(lambda: conn.refresh.all_ports(incremental=True), repeat),
+            1,
+        )
+
+
+def connect_all(ports: list[Port], repeat: int) -> BenchmarkResult:
+    with MultiConn() as conn:
+
+        def connect() -> None:
+            conn.disconnect.all()
+            conn.connect.all()
+
+        return BenchmarkResult.from_samples("Connect.all", len(ports), measure(connect, repeat), 1)
+
+
+def header_async_init(ports: list[Port], repeat: int) -> BenchmarkResult:
+    async def init_all() -> None:
+        headers = await asyncio.gather(*(ConnHeader.async_init(port) for port in ports))
+        await asyncio.gather(*(cast(Awaitable[None], header.core.close()) for header in headers))
+
+    return BenchmarkResult.from_samples(
+        "ConnHeader.async_init", len(ports), measure(lambda: run_in_sync_or_async_context(init_all), repeat), 1
+    )
+
+
+def command_burst(ports: list[Port], repeat: int, commands: int = 1000) -> BenchmarkResult:
+    cores = [CoreCommands(port) for port in ports]
+
+    async def burst() -> None:
+        await asyncio.gather(
+            *(
+                cast(Awaitable[dict[str, Any]], cores[i % len(cores)].post_tapir_command("GetAddOnVersion"))
+                for i in range(commands)
+            )
+        )
+
+    try:
+        return BenchmarkResult.from_samples(
+            f"post_tapir_command x{commands}",
+            len(ports),
+            measure(lambda: run_in_sync_or_async_context(burst), repeat),
+            commands,
+        )
+    finally:
+        for core in cores:
+            core.close()
+
+
+SCENARIOS: dict[str, Callable[[list[Port], int], BenchmarkResult]] = {
+    "init": multi_conn_init,
+    "lazy_init": multi_conn_lazy_init,
+    "lazy_primary": multi_conn_lazy_primary,
+    "create": multi_conn_create,
+    "refresh": refresh_all_ports,
+    "refresh_incremental": refresh_all_ports_incremental,
+    "connect": connect_all,
+    "header_init": header_async_init,
+    "burst": command_burst,
+}
@@ -0,0 +1,95 @@
+"""Cost of serializing requests and decoding responses with large element lists.
+
+Compares the previous request path (json.dumps, json.loads of the result, and aiohttp serializing it again, then
+json.loads of the response text) with encoding once and decoding from bytes, for every installed serializer. The
+payload is a HighlightElements request and a GetAllElements response with the given number of elements.
+
+With --port, the full round trip of GetAllElements is also measured against the instance (or the mock server)
+listening on that port.
+
+    python -m benchmarks.serialization --elements 1000 10000 50000
+    python -m benchmarks.serialization --elements 50000 --port 19723
+"""
+
+import argparse
+import json
+import uuid
+from typing import Any
+
+from benchmarks.runner import measure
+from multiconn_archicad import CoreCommands, Port
+from multiconn_archicad.utilities.serialization import available_serializers, get_serializer
+
+
+def highlight_elements(count: int) -> dict[str, Any]:
+    return {
+        "command": "API.ExecuteAddOnCommand",
+        "parameters": {
+            "addOnCommandId": {"commandNamespace": "TapirCommand", "commandName": "HighlightElements"},
+            "addOnCommandParameters": {
+                "elements": [{"elementId": {"guid": str(uuid.UUID(int=i))}} for i in range(count)],
+                "highlightedColors": [[255, 0, 0, 255]] * count,
+                "wireframe3D": False,
+            },
+        },
+    }
+
+
+def all_elements_response(count: int) -> bytes:
+    elements = [{"elementId": {"guid": str(uuid.UUID(int=i))}} for i in range(count)]
+    return json.dumps({"succeeded": True, "result": {"addOnCommandResponse": {"elements": elements}}}).encode()
+
+
+def previous_path(request: dict[str, Any], response: bytes) -> None:
+    json_str = json.dumps(request).encode("utf8")
+    json.dumps(json.loads(json_str)).encode("utf8")  # aiohttp serializes the json argument again
+    json.loads(response.decode("utf8"))
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    print(f"{name:<46} p50 {samples[len(samples) // 2] * 1e3:9.2f} ms  min {samples[0] * 1e3:9.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    for count in args.elements:
+        request, response = highlight_elements(count), all_elements_response(count)
+        print(
+            f"{count} elements, request {len(json.dumps(request)) / 1e6:.2f} MB, response {len(response) / 1e6:.2f} MB"
+        )
+        report(
+            "  previous: dumps, loads, dumps / loads text",
+            measure(lambda request=request, response=response: previous_path(request, response), args.repeat, 0),
+        )
+        for name in available_serializers():
+            serializer = get_serializer(name)
+            report(
+                f"  {name}: encode once / decode bytes",
+                measure(
+                    lambda serializer=serializer, request=request, response=response: (
+                        serializer.encode(request),
+                        serializer.decode(response),
+                    ),
+                    args.repeat,
+                    0,
+                ),
+            )
+
+        if args.port:
+            for name in available_serializers():
+                core = CoreCommands(Port(args.port), serializer=get_serializer(name))
+                report(
+                    f"  {name}: GetAllElements round trip",
+                    measure(lambda core=core: core.post_tapir_command("GetAllElements"), args.repeat, 0),
+                )
+                core.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-call overhead of calling the async API from sync code.
+
+Compares the previous behaviour (a new event loop via asyncio.run() and a new aiohttp session for every call) with the
+shared runtime loop and the pooled session of CoreCommands.
+
+Without --port only the loop overhead is measured with a no-op coroutine. With --port, API.IsAlive is also sent to
+the Archicad instance (or any stand-in server) listening on that port.
+
+    python -m benchmarks.sync_runtime --calls 10000 --port 19723
+"""
+
+import argparse
+import asyncio
+
+import aiohttp
+
+from benchmarks.runner import measure
+from multiconn_archicad import CoreCommands, Port
+from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
+
+
+async def no_op() -> None:
+    return None
+
+
+@callable_from_sync_or_async_context
+async def no_op_from_runtime() -> None:
+    return None
+
+
+async def post_with_new_session(url: str) -> dict:
+    async with (
+        aiohttp.ClientSession() as session,
+        session.post(url, json={"command": "API.IsAlive", "parameters": {}}) as response,
+    ):
+        return await response.json()
+
+
+def report(name: str, samples: list[float]) -> None:
+    calls, elapsed = len(samples), sum(samples)
+    print(f"{name:<40} {elapsed:8.3f} s total {elapsed / calls * 1e6:10.1f} us/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10_000)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    report("loop: asyncio.run per call", measure(lambda: asyncio.run(no_op()), args.calls, 0))
+    report("loop: shared runtime", measure(no_op_from_runtime, args.calls, 0))
+
+    if args.port:
+        core = CoreCommands(Port(args.port))
+        report(
+            "command: new loop and session per call",
+            measure(lambda: asyncio.run(post_with_new_session(core.url)), args.calls, 0),
+        )
+        report(
+            "command: shared runtime, pooled session",
+            measure(lambda: core.post_command("API.IsAlive"), args.calls, 0),
+        )
+        core.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -44,14 +44,14 @@ class AppState:
         self.instance_ids = self.get_instance_id()
         self.first_port = self.get_first_port()
 
-    def run(self) -> dict[Port, dict[str, Any]]:
+    async def run(self) -> dict[Port, dict[str, Any]]:
         if self.run_mode == 'Single':
             return self.run_single()
         elif self.run_mode == 'Multiple':
-            return self.run_multiple()
+            return await self.run_multiple()
 
     def run_single(self) -> dict[Port, dict[str, Any]]:
         return {self.conn.primary.port : self.script.run(self.conn.primary)}
 
-    def run_multiple(self) -> dict[Port, dict[str, Any]]:
-        return {port: self.script.run(header) for port, header in self.conn.active.items()}
+    async def run_multiple(self) -> dict[Port, dict[str, Any]]:
+        return await self.conn.run_on.active(self.script.run)
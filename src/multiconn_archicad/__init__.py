@@ -1,5 +1,7 @@
+import logging
+
 from .multi_conn import MultiConn
-from .conn_header import ConnHeader
+from .conn_header import ConnHeader, HeaderTimings
 from .basic_types import (
     ArchiCadID,
     TeamworkProjectID,
@@ -11,9 +13,19 @@ from .basic_types import (
     Port,
     APIResponseError,
     FromAPIResponse,
+    ScanDiff,
 )
 from .standard_connection import StandardConnection
-from .core_commands import CoreCommands
+from .async_standard_connection import AsyncStandardConnection
+from .core_commands import CoreCommands, PoolLimits, BatchCommand, ChunkedCommand, RequestPolicy
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .utilities.serialization import Serializer, get_serializer, set_default_serializer
+from .scheduler import Priority, RequestScheduler, SchedulerMetrics
+from .metrics import MetricsRegistry, MetricsServer, get_metrics
+from .hooks import RequestHooks, RequestInfo
+from .response_cache import CachePolicy, ResponseCache
+from .property_ids import PropertyIdResolver
+from .watcher import InstanceWatcher, PortEvent, PortEventType
 from .dialog_handlers import (
     DialogHandlerBase,
     WinDialogHandler,
@@ -24,13 +36,24 @@ from .dialog_handlers import (
 __all__: tuple[str, ...] = (
     "MultiConn",
     "ConnHeader",
+    "HeaderTimings",
     "ArchiCadID",
     "APIResponseError",
     "FromAPIResponse",
     "ProductInfo",
     "Port",
     "StandardConnection",
+    "AsyncStandardConnection",
     "CoreCommands",
+    "PoolLimits",
+    "BatchCommand",
+    "ChunkedCommand",
+    "RequestPolicy",
+    "CircuitBreaker",
+    "CircuitState",
+    "Serializer",
+    "get_serializer",
+    "set_default_serializer",
     "TeamworkCredentials",
     "DialogHandlerBase",
     "WinDialogHandler",
@@ -40,4 +63,22 @@ __all__: tuple[str, ...] = (
     "SoloProjectID",
     "UntitledProjectID",
     "ArchicadLocation",
+    "ScanDiff",
+    "Priority",
+    "RequestScheduler",
+    "SchedulerMetrics",
+    "MetricsRegistry",
+    "MetricsServer",
+    "get_metrics",
+    "RequestHooks",
+    "RequestInfo",
+    "CachePolicy",
+    "ResponseCache",
+    "PropertyIdResolver",
+    "InstanceWatcher",
+    "PortEvent",
+    "PortEventType",
 )
+
+# the application decides where the records go, see the Logging section of the README
+logging.getLogger(__name__).addHandler(logging.NullHandler())
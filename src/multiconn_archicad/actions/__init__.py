@@ -1,6 +1,7 @@
 from .connection_manager import Connect, QuitAndDisconnect, Disconnect
 from .project_handler import FindArchicad, OpenProject
 from .refresh import Refresh
+from .run_on import RunOn
 
 __all__: tuple[str, ...] = (
     "Connect",
@@ -9,4 +10,5 @@ __all__: tuple[str, ...] = (
     "Refresh",
     "FindArchicad",
     "OpenProject",
+    "RunOn",
 )
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import logging
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
@@ -7,6 +8,8 @@ if TYPE_CHECKING:
     from multiconn_archicad.multi_conn import MultiConn
     from multiconn_archicad.basic_types import Port
 
+log = logging.getLogger(__name__)
+
 
 class ConnectionManager(ABC):
     def __init__(self, multi_conn: MultiConn):
@@ -34,8 +37,22 @@ class ConnectionManager(ABC):
 class Connect(ConnectionManager):
     def execute_action(self, conn_headers: list[ConnHeader]) -> list[ConnHeader]:
         for conn_header in conn_headers:
-            print(f"connecting {conn_header.product_info}")
+            status = conn_header.status
             conn_header.connect()
+            # the fields are only built when the message is logged
+            if log.isEnabledFor(logging.INFO):
+                log.info(
+                    "Connected port %s: %s -> %s",
+                    conn_header.port,
+                    status,
+                    conn_header.status,
+                    extra={
+                        "port": conn_header.port,
+                        "product_info": conn_header.product_info,
+                        "status_from": status,
+                        "status_to": conn_header.status,
+                    },
+                )
         return conn_headers
 
     def failed(self) -> None:
@@ -1,17 +1,28 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+
+import asyncio
+import concurrent.futures
+import logging
 import subprocess
 import time
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 import psutil
 
-from multiconn_archicad.errors import NotFullyInitializedError, ProjectAlreadyOpenError
-from multiconn_archicad.utilities.platform_utils import escape_spaces_in_path, is_using_mac
 from multiconn_archicad.basic_types import Port, TeamworkCredentials, TeamworkProjectID
 from multiconn_archicad.conn_header import ConnHeader
+from multiconn_archicad.errors import NotFullyInitializedError, PortDiscoveryTimeoutError, ProjectAlreadyOpenError
+from multiconn_archicad.utilities.async_utils import get_runtime_loop, is_runtime_thread, run_in_sync_or_async_context
+from multiconn_archicad.utilities.platform_utils import escape_spaces_in_path, is_using_mac
 
 if TYPE_CHECKING:
     from multiconn_archicad.multi_conn import MultiConn
 
+log = logging.getLogger(__name__)
+
 
 class FindArchicad:
     def __init__(self, multi_conn: MultiConn):
@@ -28,10 +39,23 @@ class FindArchicad:
         return None
 
 
+@dataclass
+class LaunchMetrics:
+    pid: int
+    port: Port
+    time_to_listen: float
+    polls: int
+
+
 class OpenProject:
     def __init__(self, multi_conn: MultiConn):
         self.multi_conn: MultiConn = multi_conn
         self.process: subprocess.Popen
+        self.launch_metrics: list[LaunchMetrics] = []
+        # seconds to wait for the port after the dialogs are handled
+        self.discovery_timeout: float = 300.0
+        self.min_poll_interval: float = 0.05
+        self.max_poll_interval: float = 1.0
 
     def from_header(self, header: ConnHeader, **kwargs) -> Port | None:
         return self._execute_action(header, **kwargs)
@@ -41,15 +65,101 @@ class OpenProject:
     ) -> Port | None:
         return self._execute_action(conn_header, teamwork_credentials)
 
+    # Opens the projects concurrently. Each project is attributed the port its own process listens on. The dialogs of the
+    # launches are handled one after the other in the calling thread, as UI automation is not safe to share between
+    # threads, while the other projects keep loading. At most max_concurrency projects load at once: a launch holds its
+    # slot until its port is discovered or opening it failed, and the dialogs of the pending launches are handled when
+    # every slot is taken. The result holds the port, or the exception raised while opening, for each header.
+    def from_headers(
+        self,
+        *headers: ConnHeader,
+        max_concurrency: int = 4,
+        teamwork_credentials: TeamworkCredentials | None = None,
+    ) -> list[tuple[ConnHeader, Port | Exception]]:
+        if is_runtime_thread():
+            raise RuntimeError("Blocking call from the async runner thread would deadlock.")
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        outcomes: dict[int, Exception | concurrent.futures.Future[Port]] = {}
+        launched: deque[tuple[int, subprocess.Popen, float]] = deque()
+        discovering: set[concurrent.futures.Future[Port]] = set()
+
+        def handle_dialogs() -> None:
+            index, process, started_at = launched.popleft()
+            try:
+                self.multi_conn.dialog_handler.start(process)
+            except Exception as e:
+                log.warning("Handling the dialogs of project %d failed: %r", index, e, exc_info=e)
+                outcomes[index] = e
+            else:
+                outcomes[index] = discovery = asyncio.run_coroutine_threadsafe(
+                    self._wait_for_port(process, started_at), get_runtime_loop()
+                )
+                discovering.add(discovery)
+
+        def wait_for_slot() -> None:
+            nonlocal discovering
+            while True:
+                discovering = {discovery for discovery in discovering if not discovery.done()}
+                if len(launched) + len(discovering) < max_concurrency:
+                    return
+                if launched:
+                    handle_dialogs()
+                else:
+                    concurrent.futures.wait(discovering, return_when=concurrent.futures.FIRST_COMPLETED)
+
+        for index, header in enumerate(headers):
+            try:
+                self._check_input(header, teamwork_credentials)
+                wait_for_slot()
+                started_at = time.perf_counter()
+                launched.append((index, self._start_process(header, teamwork_credentials), started_at))
+            except Exception as e:
+                log.warning("Launching project %d failed: %r", index, e, exc_info=e)
+                outcomes[index] = e
+        while launched:
+            handle_dialogs()
+
+        results: list[tuple[ConnHeader, Port | Exception]] = []
+        for index, header in enumerate(headers):
+            outcome = outcomes[index]
+            if isinstance(outcome, concurrent.futures.Future):
+                try:
+                    port = outcome.result()
+                except Exception as e:
+                    log.warning("Discovering the port of project %d failed: %r", index, e, exc_info=e)
+                    results.append((header, e))
+                    continue
+                self._add_header(port)
+                results.append((header, port))
+            else:
+                results.append((header, outcome))
+        self.multi_conn.open_port_headers = dict(sorted(self.multi_conn.open_port_headers.items()))
+        return results
+
     def _execute_action(
         self, conn_header: ConnHeader, teamwork_credentials: TeamworkCredentials | None = None
     ) -> Port | None:
         self._check_input(conn_header, teamwork_credentials)
-        self._open_project(conn_header, teamwork_credentials)
-        port = Port(self._find_archicad_port())
-        self.multi_conn.open_port_headers.update({port: ConnHeader(port)})
+        started_at = time.perf_counter()
+        self.process = self._start_process(conn_header, teamwork_credentials)
+        self.multi_conn.dialog_handler.start(self.process)
+        port = run_in_sync_or_async_context(self._wait_for_port, self.process, started_at)
+        self._add_header(port)
         return port
 
+    # The first access of the headers of a lazy MultiConn scans the ports, and may already find the new instance
+    def _add_header(self, port: Port) -> None:
+        open_port_headers = self.multi_conn.open_port_headers
+        if port not in open_port_headers:
+            open_port_headers[port] = ConnHeader(
+                port,
+                pool_limits=self.multi_conn.pool_limits,
+                request_policy=self.multi_conn.request_policy,
+                hooks=self.multi_conn.hooks,
+                cache_policy=self.multi_conn.cache_policy,
+            )
+
     def _check_input(
         self, header_to_check: ConnHeader, teamwork_credentials: TeamworkCredentials | None = None
     ) -> None:
@@ -65,28 +175,55 @@ class OpenProject:
         if port:
             raise ProjectAlreadyOpenError(f"Project is already open at port: {port}")
 
-    def _open_project(self, conn_header: ConnHeader, teamwork_credentials: TeamworkCredentials | None = None) -> None:
-        self._start_process(conn_header, teamwork_credentials)
-        self.multi_conn.dialog_handler.start(self.process)
-
-    def _start_process(self, conn_header: ConnHeader, teamwork_credentials: TeamworkCredentials | None = None) -> None:
-        print(f"opening project: {conn_header.archicad_id.projectName}")
-        self.process = subprocess.Popen(
+    def _start_process(
+        self, conn_header: ConnHeader, teamwork_credentials: TeamworkCredentials | None = None
+    ) -> subprocess.Popen:
+        project_name = conn_header.archicad_id.projectName
+        log.info("Opening project %s", project_name, extra={"project_name": project_name})
+        process = subprocess.Popen(
             f"{escape_spaces_in_path(conn_header.archicad_location.archicadLocation)} "
             f"{escape_spaces_in_path(conn_header.archicad_id.get_project_location(teamwork_credentials))}",
             start_new_session=True,
             shell=is_using_mac(),
             text=True,
         )
+        return process
+
+    async def _wait_for_port(self, process: subprocess.Popen, started_at: float) -> Port:
+        port, metrics = await self._discover_port(process, started_at)
+        self.launch_metrics.append(metrics)
+        log.info(
+            "Detected Archicad listening on port %s after %.2f s",
+            port,
+            metrics.time_to_listen,
+            extra={"port": port, "duration": metrics.time_to_listen, "pid": process.pid},
+        )
+        return port
 
-    def _find_archicad_port(self):
-        psutil_process = psutil.Process(self.process.pid)
-
-        while True:
-            connections = psutil_process.net_connections(kind="inet")
-            for conn in connections:
-                if conn.status == psutil.CONN_LISTEN:
-                    if conn.laddr.port in self.multi_conn.port_range:
-                        print(f"Detected Archicad listening on port {conn.laddr.port}")
-                        return conn.laddr.port
-            time.sleep(1)
+    # Polls the connections of the process with back-off until it listens on a port of the range, or the deadline
+    async def _discover_port(self, process: subprocess.Popen, started_at: float) -> tuple[Port, LaunchMetrics]:
+        psutil_process = psutil.Process(process.pid)
+        for polls, delay in enumerate(self._poll_intervals(time.monotonic() + self.discovery_timeout), start=1):
+            port = await asyncio.to_thread(self._get_listening_port, psutil_process)
+            if port:
+                return port, LaunchMetrics(
+                    pid=process.pid, port=port, time_to_listen=time.perf_counter() - started_at, polls=polls
+                )
+            await asyncio.sleep(delay)
+        raise PortDiscoveryTimeoutError(
+            f"Archicad (pid: {process.pid}) did not start listening within {self.discovery_timeout} s"
+        )
+
+    # The delays double from min_poll_interval up to max_poll_interval, the last poll is made at the deadline
+    def _poll_intervals(self, deadline: float) -> Iterator[float]:
+        delay = self.min_poll_interval
+        while (remaining := deadline - time.monotonic()) > 0:
+            yield min(delay, remaining)
+            delay = min(delay * 2, self.max_poll_interval)
+        yield 0.0
+
+    def _get_listening_port(self, psutil_process: psutil.Process) -> Port | None:
+        for conn in psutil_process.net_connections(kind="inet"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr.port in self.multi_conn.port_range:
+                return Port(conn.laddr.port)
+        return None
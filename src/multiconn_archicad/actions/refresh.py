@@ -1,11 +1,15 @@
 from __future__ import annotations
+import logging
+import time
 from typing import TYPE_CHECKING
 from multiconn_archicad.core_commands import callable_from_sync_or_async_context
 
 if TYPE_CHECKING:
     from multiconn_archicad.conn_header import ConnHeader
     from multiconn_archicad.multi_conn import MultiConn
-    from multiconn_archicad.basic_types import Port
+    from multiconn_archicad.basic_types import Port, ScanDiff
+
+log = logging.getLogger(__name__)
 
 
 class Refresh:
@@ -13,31 +17,49 @@ class Refresh:
         self.multi_conn: MultiConn = multi_conn
 
     @callable_from_sync_or_async_context
-    async def from_ports(self, *args: Port) -> None:
-        await self.execute_action([*args])
+    async def from_ports(self, *args: Port, incremental: bool = False) -> ScanDiff:
+        return await self.execute_action([*args], incremental)
 
     @callable_from_sync_or_async_context
-    async def from_headers(self, *args: ConnHeader) -> None:
-        await self.execute_action(
-            [port for port, header in self.multi_conn.open_port_headers.items() if header in args]
+    async def from_headers(self, *args: ConnHeader, incremental: bool = False) -> ScanDiff:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(
+            [port for port, header in self.multi_conn.open_port_headers.items() if header in args], incremental
         )
 
     @callable_from_sync_or_async_context
-    async def all_ports(self) -> None:
-        await self.execute_action(self.multi_conn.port_range)
+    async def all_ports(self, incremental: bool = False) -> ScanDiff:
+        return await self.execute_action(self.multi_conn.port_range, incremental)
 
     @callable_from_sync_or_async_context
-    async def open_ports(self) -> None:
-        await self.execute_action(self.multi_conn.open_ports)
+    async def open_ports(self, incremental: bool = False) -> ScanDiff:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(self.multi_conn.open_ports, incremental)
 
     @callable_from_sync_or_async_context
-    async def closed_ports(self) -> None:
-        await self.execute_action(self.multi_conn.closed_ports)
-
-    async def execute_action(self, ports: list[Port]) -> None:
-        await self.multi_conn.scan_ports(ports)
-        self.multi_conn.open_port_headers = dict(sorted(self.multi_conn.open_port_headers.items()))
-        print(
-            f"Refreshing - Open ports: {len(self.multi_conn.open_port_headers)} db,"
-            f" closed ports: {len(self.multi_conn.closed_ports)}"
-        )
+    async def closed_ports(self, incremental: bool = False) -> ScanDiff:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(self.multi_conn.closed_ports, incremental)
+
+    # Incremental refreshes only re-fetch the headers of instances whose product or project changed
+    async def execute_action(self, ports: list[Port], incremental: bool = False) -> ScanDiff:
+        start = time.perf_counter()
+        diff = await self.multi_conn.scan_ports(ports, incremental)
+        if log.isEnabledFor(logging.INFO):
+            open_ports, closed_ports = self.multi_conn.open_ports, self.multi_conn.closed_ports
+            duration = time.perf_counter() - start
+            log.info(
+                "Refreshed %d ports in %.3f s - open ports: %d, closed ports: %d",
+                len(ports),
+                duration,
+                len(open_ports),
+                len(closed_ports),
+                extra={
+                    "duration": duration,
+                    "incremental": incremental,
+                    "open_ports": open_ports,
+                    "closed_ports": closed_ports,
+                    "diff": diff,
+                },
+            )
+        return diff
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
+
+if TYPE_CHECKING:
+    from multiconn_archicad.basic_types import Port
+    from multiconn_archicad.conn_header import ConnHeader
+    from multiconn_archicad.multi_conn import MultiConn
+
+
+class RunOn:
+    def __init__(self, multi_conn: MultiConn, max_workers: int = 8) -> None:
+        self.multi_conn: MultiConn = multi_conn
+        self.max_workers: int = max_workers
+
+    @callable_from_sync_or_async_context
+    async def from_ports(
+        self, ports: Iterable[Port], fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> dict[Port, Any]:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(
+            [self.multi_conn.open_port_headers[port] for port in ports if port in self.multi_conn.open_port_headers],
+            fn,
+            *args,
+            timeout=timeout,
+            **kwargs,
+        )
+
+    @callable_from_sync_or_async_context
+    async def from_headers(
+        self,
+        headers: Iterable[ConnHeader],
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> dict[Port, Any]:
+        return await self.execute_action(list(headers), fn, *args, timeout=timeout, **kwargs)
+
+    @callable_from_sync_or_async_context
+    async def active(
+        self, fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> dict[Port, Any]:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(list(self.multi_conn.active.values()), fn, *args, timeout=timeout, **kwargs)
+
+    @callable_from_sync_or_async_context
+    async def all(
+        self, fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> dict[Port, Any]:
+        await self.multi_conn._ensure_scanned()
+        return await self.execute_action(
+            list(self.multi_conn.open_port_headers.values()), fn, *args, timeout=timeout, **kwargs
+        )
+
+    # Sync functions run on a bounded thread pool, coroutine functions on the event loop. The result of each
+    # instance is either the return value of the function, or the exception it raised (TimeoutError on timeout).
+    async def execute_action(
+        self,
+        conn_headers: list[ConnHeader],
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> dict[Port, Any]:
+        conn_headers = [conn_header for conn_header in conn_headers if conn_header.port]
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="RunOn")
+        try:
+            results = await asyncio.gather(
+                *(self._run(executor, conn_header, fn, args, kwargs, timeout) for conn_header in conn_headers),
+                return_exceptions=True,
+            )
+        finally:
+            # threads of timed out functions are left to finish on their own, queued calls are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        return {conn_header.port: result for conn_header, result in zip(conn_headers, results) if conn_header.port}
+
+    @staticmethod
+    async def _run(
+        executor: ThreadPoolExecutor,
+        conn_header: ConnHeader,
+        fn: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        timeout: float | None,
+    ) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            return await asyncio.wait_for(fn(conn_header, *args, **kwargs), timeout)
+        future = asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(fn, conn_header, *args, **kwargs)
+        )
+        return await asyncio.wait_for(future, timeout)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import dis
+import functools
+import inspect
+import sys
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, cast, get_origin
+from uuid import UUID
+
+from archicad.acbasetype import _ACBaseType, _ListBuilder
+from archicad.releases import Commands, Types, Utilities
+
+from multiconn_archicad.standard_connection import load_release
+
+if TYPE_CHECKING:
+    from multiconn_archicad.basic_types import ProductInfo
+    from multiconn_archicad.core_commands import CoreCommands
+
+
+@dataclass(frozen=True)
+class _AsyncRelease:
+    types: Any
+    commands: type
+    utilities: type
+
+
+class AsyncStandardConnection:
+    """The official python wrapper with awaitable commands, sent through the pooled transport of CoreCommands.
+
+    The commands and utilities take and return the same types as the ones of StandardConnection, and raise the
+    same UnsucceededCommandCall, but are coroutine functions. The async classes are built from the signatures of the
+    commands of the release the first time they are used.
+    """
+
+    def __init__(self, core: CoreCommands):
+        self.core: CoreCommands = core
+        self._release: tuple[int, int] | None = None
+        self._namespaces: tuple[Any, Any, Any] | None = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(core={self.core!r}, release={self._release})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    @property
+    def types(self) -> Any:
+        return self._get_namespaces()[0] if self._release else Types
+
+    @property
+    def commands(self) -> Any:
+        return self._get_namespaces()[1] if self._release else Commands
+
+    @property
+    def utilities(self) -> Any:
+        return self._get_namespaces()[2] if self._release else Utilities
+
+    def connect(self, product_info: ProductInfo) -> None:
+        loaded = load_release(product_info.version, product_info.build)
+        release = (loaded.release, loaded.build)
+        if release != self._release:
+            self._release, self._namespaces = release, None
+
+    def disconnect(self) -> None:
+        self._release, self._namespaces = None, None
+
+    def _get_namespaces(self) -> tuple[Any, Any, Any]:
+        if self._namespaces is None:
+            assert self._release is not None
+            release = build_async_release(*self._release)
+            commands = release.commands(self.core)
+            self._namespaces = (release.types, commands, release.utilities(release.types, commands))
+        return self._namespaces
+
+
+class _AsyncCommands:
+    def __init__(self, core: CoreCommands):
+        self._core: CoreCommands = core
+
+
+class _AsyncUtilities:
+    # the utilities of the release, created for each call with commands that block their worker thread
+    _utilities: type
+
+    def __init__(self, actypes: Any, accommands: _AsyncCommands):
+        self.actypes: Any = actypes
+        self.accommands: _AsyncCommands = accommands
+
+
+class _BlockingCommands:
+    """The async commands for the utilities of the release, called from a worker thread and awaited on the loop of
+    the caller."""
+
+    def __init__(self, commands: _AsyncCommands, loop: asyncio.AbstractEventLoop):
+        self._commands: _AsyncCommands = commands
+        self._loop: asyncio.AbstractEventLoop = loop
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        command = getattr(self._commands, name)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return asyncio.run_coroutine_threadsafe(command(*args, **kwargs), self._loop).result()
+
+        return call
+
+
+@functools.cache
+def build_async_release(release: int, build: int) -> _AsyncRelease:
+    loaded = load_release(release, build)
+    error = sys.modules[loaded.commands.__module__].UnsucceededCommandCall
+    commands = type(
+        "Commands",
+        (_AsyncCommands,),
+        {
+            name: _async_command(name, method, error)
+            for name, method in inspect.getmembers(loaded.commands, inspect.isfunction)
+            if not name.startswith("_")
+        },
+    )
+    utilities = type(
+        "Utilities",
+        (_AsyncUtilities,),
+        {"_utilities": loaded.utilities}
+        | {
+            name: _async_utility(name, method) if inspect.isfunction(method) else method
+            for name, method in vars(loaded.utilities).items()
+            if not name.startswith("_")
+        },
+    )
+    return _AsyncRelease(loaded.types, commands, utilities)
+
+
+# The parameters are serialized, and the result is built from the keys the wrapper reads and the annotations of the
+# command, as the wrapper does
+def _async_command(name: str, method: Callable[..., Any], error: type[Exception]) -> Callable[..., Awaitable[Any]]:
+    signature = inspect.signature(method)
+    build_result = _result_builder(signature.return_annotation, _result_keys(method))
+    command = f"API.{name}"
+
+    @functools.wraps(method)
+    async def call(self: _AsyncCommands, *args: Any, **kwargs: Any) -> Any:
+        arguments = signature.bind(self, *args, **kwargs).arguments
+        parameters = {key: _to_json(value) for key, value in list(arguments.items())[1:] if value is not None}
+        result = await cast(Awaitable[dict[str, Any]], self._core.post_command(command, parameters))
+        if not result["succeeded"]:
+            raise error(result)
+        return build_result(result.get("result", {}))
+
+    return call
+
+
+# The utilities run in a worker thread, and the commands they call are sent through the core on the loop of the caller
+def _async_utility(name: str, method: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def call(self: _AsyncUtilities, *args: Any, **kwargs: Any) -> Any:
+        commands = _BlockingCommands(self.accommands, asyncio.get_running_loop())
+        utilities = self._utilities(self.actypes, commands)
+        return await asyncio.to_thread(getattr(utilities, name), *args, **kwargs)
+
+    return call
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, _ACBaseType):
+        return value.to_dict()
+    if isinstance(value, UUID):
+        return str(value).upper()
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    return value
+
+
+# The keys of the result the wrapper returns, in order. They are read from the compiled command, which subscripts
+# result["result"] with each of them, so the sources of the wrapper are not needed.
+def _result_keys(method: Callable[..., Any]) -> list[str]:
+    instructions = list(dis.get_instructions(method))
+    return [
+        key.argval
+        for result, subscript, key, key_subscript in zip(
+            instructions, instructions[1:], instructions[2:], instructions[3:]
+        )
+        if result.opname == "LOAD_CONST"
+        and result.argval == "result"
+        and _is_subscript(subscript)
+        and key.opname == "LOAD_CONST"
+        and isinstance(key.argval, str)
+        and _is_subscript(key_subscript)
+    ]
+
+
+def _is_subscript(instruction: dis.Instruction) -> bool:
+    return instruction.opname == "BINARY_SUBSCR" or (instruction.opname == "BINARY_OP" and instruction.argrepr == "[]")
+
+
+# Commands returning a tuple read one key of the result for each value, the others a single key
+def _result_builder(annotation: Any, keys: list[str]) -> Callable[[dict[str, Any]], Any]:
+    if annotation is inspect.Signature.empty or annotation is None:
+        return lambda result: None
+    annotations = annotation.__args__ if get_origin(annotation) is tuple else (annotation,)
+    constructors = [(key, _constructor(item)) for key, item in zip(keys, annotations, strict=True)]
+    if get_origin(annotation) is tuple:
+        return lambda result: tuple(constructor(result[key]) for key, constructor in constructors)
+    ((key, constructor),) = constructors
+    return lambda result: constructor(result[key])
+
+
+# Types without fields (the response of add-on commands) are returned as they are, like primitive values
+def _constructor(annotation: Any) -> Callable[[Any], Any]:
+    if get_origin(annotation) is list:
+        return _ListBuilder(annotation.__args__[0])
+    if isinstance(annotation, type) and issubclass(annotation, _ACBaseType) and annotation.get_classinfo().fields:
+        return lambda value: annotation(**value)
+    return lambda value: value
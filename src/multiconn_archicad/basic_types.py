@@ -1,4 +1,4 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import Self, Protocol, Type, Any, TypeVar, Union, ClassVar
 import re
 from urllib.parse import unquote
@@ -73,6 +73,19 @@ class APIResponseError(BaseModel):
         )
 
 
+@dataclass
+class ScanDiff(BaseModel):
+    """Ports whose state changed during a scan. Changed ports were open before and after, with a different
+    product or project."""
+
+    opened: list[Port] = field(default_factory=list)
+    closed: list[Port] = field(default_factory=list)
+    changed: list[Port] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.opened or self.closed or self.changed)
+
+
 @dataclass
 class TeamworkCredentials(BaseModel):
     username: str
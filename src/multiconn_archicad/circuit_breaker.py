@@ -0,0 +1,67 @@
+import threading
+import time
+from enum import Enum
+
+from multiconn_archicad.errors import CircuitOpenError
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}.{self.name}"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
+class CircuitBreaker:
+    """Fast-fails the requests to an instance after failure_threshold consecutive transport failures.
+
+    After reset_timeout a single trial request is let through. If it succeeds the circuit closes, if it fails the
+    circuit opens again. A trial that never finishes (e.g. it was cancelled) is replaced after another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: CircuitState = CircuitState.CLOSED
+        self.failures: int = 0
+        self._opened_at: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(state={self.state}, failures={self.failures})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Circuit is {self.state.value} after {self.failures} failures, "
+                    f"retrying in {self.reset_timeout - (time.monotonic() - self._opened_at):.1f} s"
+                )
+            # this request is the trial, the others keep failing until it finishes
+            self.state = CircuitState.HALF_OPEN
+            self._opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        self.record_success()
@@ -1,8 +1,14 @@
+import asyncio
+import time
+from dataclasses import dataclass
 from enum import Enum
-from typing import Self, Any, Awaitable, cast
+from typing import Self, Any, Awaitable, Callable, cast
 from pprint import pformat
 
-from multiconn_archicad.core_commands import CoreCommands
+from multiconn_archicad.core_commands import CoreCommands, PoolLimits, RequestPolicy
+from multiconn_archicad.hooks import RequestHooks
+from multiconn_archicad.response_cache import CachePolicy
+from multiconn_archicad.scheduler import Priority, RequestScheduler
 from multiconn_archicad.basic_types import (
     ArchiCadID,
     APIResponseError,
@@ -12,7 +18,8 @@ from multiconn_archicad.basic_types import (
     ArchicadLocation,
 )
 from multiconn_archicad.standard_connection import StandardConnection
-from multiconn_archicad.utilities.async_utils import run_in_sync_or_async_context
+from multiconn_archicad.async_standard_connection import AsyncStandardConnection
+from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context, run_in_sync_or_async_context
 
 
 class Status(Enum):
@@ -28,19 +35,57 @@ class Status(Enum):
         return self.__repr__()
 
 
+@dataclass
+class HeaderTimings:
+    """Seconds from the start of a header (re)initialization until each request finished."""
+
+    product_info: float = 0.0
+    archicad_id: float = 0.0
+    archicad_location: float = 0.0
+    total: float = 0.0
+
+
 class ConnHeader:
-    def __init__(self, port: Port, initialize: bool = True):
+    def __init__(
+        self,
+        port: Port,
+        initialize: bool = True,
+        pool_limits: PoolLimits | None = None,
+        request_policy: RequestPolicy | None = None,
+        hooks: RequestHooks | None = None,
+        cache_policy: CachePolicy | None = None,
+    ):
         self.port: Port | None = port
         self.status: Status = Status.PENDING
-        self.core: CoreCommands = CoreCommands(self.port)
-        self.standard: StandardConnection = StandardConnection(self.port)
+        pool_limits = pool_limits if pool_limits is not None else PoolLimits()
+        # every request to the port goes through the scheduler, the header requests with high priority
+        self.scheduler: RequestScheduler = RequestScheduler(pool_limits.max_in_flight)
+        # called around the commands of the core and standard namespaces
+        self.hooks: RequestHooks = hooks if hooks is not None else RequestHooks()
+        self.core: CoreCommands = CoreCommands(
+            port,
+            pool_limits,
+            scheduler=self.scheduler,
+            request_policy=request_policy,
+            hooks=self.hooks,
+            cache_policy=cache_policy,
+        )
+        self.standard: StandardConnection = StandardConnection(self.port, self.hooks, self.core.cache)
+        self.async_standard: AsyncStandardConnection = AsyncStandardConnection(self.core)
+        self.timings: HeaderTimings = HeaderTimings()
+        # product and project info of the last refresh, used to detect changes cheaply
+        self._fingerprint: tuple[ProductInfo | APIResponseError, ArchiCadID | APIResponseError] | None = None
+        # tasks closing the pool, started by disconnect() and unassign() in async code
+        self._closing: set[asyncio.Task[None]] = set()
 
         if initialize:
-            self.product_info: ProductInfo | APIResponseError = run_in_sync_or_async_context(self.get_product_info)
-            self.archicad_id: ArchiCadID | APIResponseError = run_in_sync_or_async_context(self.get_archicad_id)
-            self.archicad_location: ArchicadLocation | APIResponseError = run_in_sync_or_async_context(
-                self.get_archicad_location
+            self.product_info: ProductInfo | APIResponseError
+            self.archicad_id: ArchiCadID | APIResponseError
+            self.archicad_location: ArchicadLocation | APIResponseError
+            self.product_info, self.archicad_id, self.archicad_location = run_in_sync_or_async_context(
+                self.get_header_info
             )
+            self._fingerprint = (self.product_info, self.archicad_id)
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -71,37 +116,74 @@ class ConnHeader:
         return False
 
     def __repr__(self) -> str:
-        attrs = {name: getattr(self, name) for name in ["port", "status", "product_info", "archicad_id", "archicad_location"]}
+        attrs = {
+            name: getattr(self, name) for name in ["port", "status", "product_info", "archicad_id", "archicad_location"]
+        }
         return f"{self.__class__.__name__}({attrs})"
 
     def __str__(self) -> str:
-        attrs = {name: getattr(self, name) for name in ["port", "status", "product_info", "archicad_id", "archicad_location"]}
+        attrs = {
+            name: getattr(self, name) for name in ["port", "status", "product_info", "archicad_id", "archicad_location"]
+        }
         return f"{self.__class__.__name__}(\n{pformat(attrs, width=200, indent=4)})"
 
     @classmethod
-    async def async_init(cls, port: Port) -> Self:
-        instance = cls(port, initialize=False)
-        instance.product_info = await instance.get_product_info()
-        instance.archicad_id = await instance.get_archicad_id()
-        instance.archicad_location = await instance.get_archicad_location()
+    async def async_init(
+        cls,
+        port: Port,
+        pool_limits: PoolLimits | None = None,
+        request_policy: RequestPolicy | None = None,
+        hooks: RequestHooks | None = None,
+        cache_policy: CachePolicy | None = None,
+    ) -> Self:
+        instance = cls(
+            port,
+            initialize=False,
+            pool_limits=pool_limits,
+            request_policy=request_policy,
+            hooks=hooks,
+            cache_policy=cache_policy,
+        )
+        instance.product_info, instance.archicad_id, instance.archicad_location = await instance.get_header_info()
+        instance._fingerprint = (instance.product_info, instance.archicad_id)
         return instance
 
     def connect(self) -> None:
-        if self.is_product_info_initialized():
-            self.standard.connect(self.product_info)
+        if isinstance(product_info := self.product_info, ProductInfo):
+            self.standard.connect(product_info)
+            self.async_standard.connect(product_info)
             self.status = Status.ACTIVE
         else:
             self.status = Status.FAILED
 
     def disconnect(self) -> None:
         self.standard.disconnect()
+        self.async_standard.disconnect()
+        self._close_core()
         self.status = Status.PENDING
 
     def unassign(self) -> None:
         self.standard.disconnect()
+        self.async_standard.disconnect()
+        self._close_core()
         self.status = Status.UNASSIGNED
         self.port = None
 
+    # Closes the pool, and awaits the pool closes started by disconnect() and unassign() on the running loop
+    @callable_from_sync_or_async_context
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(task for task in list(self._closing) if task.get_loop() is loop))
+        await cast(Awaitable[None], self.core.close())
+
+    # Sync callers wait for the pool to close. In async code it is closed by a task of the running loop, which is kept
+    # until it is done, so it is not collected half way, and close() can await it.
+    def _close_core(self) -> None:
+        closing = self.core.close()
+        if isinstance(closing, asyncio.Task):
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+
     def is_fully_initialized(self) -> bool:
         return self.is_product_info_initialized() and self.is_id_and_location_initialized()
 
@@ -111,14 +193,79 @@ class ConnHeader:
     def is_id_and_location_initialized(self) -> bool:
         return isinstance(self.archicad_id, ArchiCadID) and isinstance(self.archicad_location, ArchicadLocation)
 
+    # Both refresh methods return True if the product or the project of the instance changed since the last refresh
+    async def refresh(self) -> bool:
+        return self._update_header_info(*await self.get_header_info())
+
+    async def refresh_if_changed(self) -> bool:
+        product_info, archicad_id = await asyncio.gather(self.get_product_info(), self.get_archicad_id())
+        if (product_info, archicad_id) == self._fingerprint:
+            return False
+        return self._update_header_info(product_info, archicad_id, await self.get_archicad_location())
+
+    def _update_header_info(
+        self,
+        product_info: ProductInfo | APIResponseError,
+        archicad_id: ArchiCadID | APIResponseError,
+        archicad_location: ArchicadLocation | APIResponseError,
+    ) -> bool:
+        changed = self._fingerprint is not None and self._fingerprint != (product_info, archicad_id)
+        self._fingerprint = (product_info, archicad_id)
+        if changed and self.core.cache is not None:
+            # the cached responses belong to the previous project
+            self.core.cache.clear()
+        # failed requests do not overwrite values that were already initialized
+        if isinstance(self.product_info, APIResponseError) or isinstance(product_info, ProductInfo):
+            self.product_info = product_info
+        if isinstance(self.archicad_id, APIResponseError) or isinstance(archicad_id, ArchiCadID):
+            self.archicad_id = archicad_id
+        if isinstance(self.archicad_location, APIResponseError) or isinstance(archicad_location, ArchicadLocation):
+            self.archicad_location = archicad_location
+        return changed
+
+    # The three requests are independent, so they are sent concurrently. The time each of them took is
+    # stored in .timings
+    async def get_header_info(
+        self,
+    ) -> tuple[ProductInfo | APIResponseError, ArchiCadID | APIResponseError, ArchicadLocation | APIResponseError]:
+        start = time.perf_counter()
+
+        async def timed[T](getter: Callable[[], Awaitable[T]]) -> tuple[T, float]:
+            result = await getter()
+            return result, time.perf_counter() - start
+
+        (
+            (product_info, product_info_time),
+            (archicad_id, archicad_id_time),
+            (location, location_time),
+        ) = await asyncio.gather(
+            timed(self.get_product_info), timed(self.get_archicad_id), timed(self.get_archicad_location)
+        )
+        self.timings = HeaderTimings(
+            product_info=product_info_time,
+            archicad_id=archicad_id_time,
+            archicad_location=location_time,
+            total=time.perf_counter() - start,
+        )
+        return product_info, archicad_id, location
+
     async def get_product_info(self) -> ProductInfo | APIResponseError:
-        result = await cast(Awaitable[dict[str, Any]], self.core.post_command(command="API.GetProductInfo"))
+        result = await cast(
+            Awaitable[dict[str, Any]],
+            self.core.post_command(command="API.GetProductInfo", priority=Priority.HIGH, fresh=True),
+        )
         return await create_object_or_error_from_response(result, ProductInfo)
 
     async def get_archicad_id(self) -> ArchiCadID | APIResponseError:
-        result = await cast(Awaitable[dict[str, Any]], self.core.post_tapir_command(command="GetProjectInfo"))
+        result = await cast(
+            Awaitable[dict[str, Any]],
+            self.core.post_tapir_command(command="GetProjectInfo", priority=Priority.HIGH, fresh=True),
+        )
         return await create_object_or_error_from_response(result, ArchiCadID)
 
     async def get_archicad_location(self) -> ArchicadLocation | APIResponseError:
-        result = await cast(Awaitable[dict[str, Any]], self.core.post_tapir_command(command="GetArchicadLocation"))
+        result = await cast(
+            Awaitable[dict[str, Any]],
+            self.core.post_tapir_command(command="GetArchicadLocation", priority=Priority.HIGH, fresh=True),
+        )
         return await create_object_or_error_from_response(result, ArchicadLocation)
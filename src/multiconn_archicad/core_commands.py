@@ -1,49 +1,494 @@
-import json
-from typing import Any, Awaitable, cast
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, ClassVar, Mapping, Sequence
 import aiohttp
 
-from multiconn_archicad.basic_types import Port
-from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
+from multiconn_archicad.basic_types import Port, APIResponseError
+from multiconn_archicad.circuit_breaker import CircuitBreaker
+from multiconn_archicad.errors import CommandFailedError, CircuitOpenError
+from multiconn_archicad.hooks import RequestHooks, RequestInfo
+from multiconn_archicad.metrics import MetricsRegistry, get_metrics
+from multiconn_archicad.response_cache import CachePolicy, ResponseCache
+from multiconn_archicad.scheduler import Priority, RequestScheduler
+from multiconn_archicad.utilities.async_utils import (
+    callable_from_sync_or_async_context,
+    close_on_shutdown,
+    run_on_loop,
+)
+from multiconn_archicad.utilities.json_stream import JsonArrayStream
+from multiconn_archicad.utilities.serialization import Serializer, get_serializer
+
+
+@dataclass(frozen=True)
+class PoolLimits:
+    """Limits of the keep-alive connection pool kept for a single port."""
+
+    limit: int = 8
+    keepalive_timeout: float = 30.0
+    # requests sent to Archicad at the same time, the rest wait in the scheduler of the port
+    max_in_flight: int = 2
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """Timeouts, retries and circuit breaking of the requests sent to a single port. Times are in seconds.
+
+    Commands are identified by their name, "API.<name>" for official commands and the bare name for Tapir commands.
+    Idempotent commands (the ones that only read, by default every command whose name starts with Get, and IsAlive)
+    are retried after timeouts and lost connections. Other commands are only retried if the connection could not be
+    made, because Archicad may have executed them already.
+    """
+
+    timeout: float | None = 60.0
+    command_timeouts: Mapping[str, float] = field(
+        default_factory=lambda: {
+            "API.IsAlive": 5.0,
+            "API.GetProductInfo": 5.0,
+            "GetAddOnVersion": 5.0,
+            "GetProjectInfo": 5.0,
+            "GetArchicadLocation": 5.0,
+        }
+    )
+    retries: int = 2
+    backoff: float = 0.1
+    max_backoff: float = 2.0
+    idempotent_commands: frozenset[str] = frozenset()
+    # consecutive transport failures that open the circuit, and the time until a trial request is let through
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    # timeout of the GET probe of port scans, and of ports that were open at the previous scan
+    probe_timeout: float = 0.2
+    known_port_probe_timeout: float = 2.0
+
+    def timeout_of(self, command: str) -> float | None:
+        return self.command_timeouts.get(command, self.timeout)
+
+    def is_idempotent(self, command: str) -> bool:
+        name = command.removeprefix("API.")
+        return command in self.idempotent_commands or name.startswith("Get") or name == "IsAlive"
+
+    def is_retryable(self, command: str, error: Exception) -> bool:
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return True
+        return self.is_idempotent(command) and isinstance(error, (aiohttp.ClientError, TimeoutError))
+
+    # exponential back-off with full jitter, so retries from many callers do not arrive together
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+# Commands starting with "API." are built-in JSON API commands, everything else is sent as a Tapir command
+type BatchCommand = tuple[str, dict[str, Any] | None]
+
+# Code of the APIResponseError returned in place of a response that could not be received
+TRANSPORT_ERROR_CODE: int = -1
+
+
+@dataclass(frozen=True)
+class ChunkedCommand:
+    """The list parameters of a command that are split into chunks of the same positions, and whether the chunks
+    can be sent in parallel. Commands that modify the project are sent one chunk after the other."""
+
+    list_parameters: tuple[str, ...]
+    parallel: bool = False
+
+
+# Only commands whose chunks add up to the whole command can be chunked. HighlightElements is not one of them: it sets
+# the highlight of the whole model, so each chunk would reset the highlight of the elements of the previous ones.
+CHUNKED_COMMANDS: dict[str, ChunkedCommand] = {
+    "API.GetPropertyValuesOfElements": ChunkedCommand(("elements",), parallel=True),
+    "API.GetBoundingBoxes3D": ChunkedCommand(("elements",), parallel=True),
+    "API.SetPropertyValuesOfElements": ChunkedCommand(("elementPropertyValues",)),
+    "GetPropertyValuesOfElements": ChunkedCommand(("elements",), parallel=True),
+    "GetDetailsOfElements": ChunkedCommand(("elements",), parallel=True),
+    "SetPropertyValuesOfElements": ChunkedCommand(("elementPropertyValues",)),
+}
 
 
 class CoreCommands:
     _BASE_URL: str = "http://127.0.0.1"
 
-    def __init__(self, port: Port):
+    _HEADERS: ClassVar[dict[str, str]] = {"Content-Type": "application/json"}
+
+    def __init__(
+        self,
+        port: Port,
+        pool_limits: PoolLimits | None = None,
+        serializer: Serializer | None = None,
+        scheduler: RequestScheduler | None = None,
+        request_policy: RequestPolicy | None = None,
+        metrics: MetricsRegistry | None = None,
+        hooks: RequestHooks | None = None,
+        cache_policy: CachePolicy | None = None,
+    ):
         self.port: Port = port
+        self.pool_limits: PoolLimits = pool_limits if pool_limits is not None else PoolLimits()
+        self.request_policy: RequestPolicy = request_policy if request_policy is not None else RequestPolicy()
+        self.circuit_breaker: CircuitBreaker = CircuitBreaker(
+            self.request_policy.failure_threshold, self.request_policy.reset_timeout
+        )
+        self.scheduler: RequestScheduler = (
+            scheduler if scheduler is not None else RequestScheduler(self.pool_limits.max_in_flight)
+        )
+        # orjson or msgspec when installed, the json module otherwise
+        self.serializer: Serializer = serializer if serializer is not None else get_serializer()
+        # records nothing until it is enabled
+        self.metrics: MetricsRegistry = metrics if metrics is not None else get_metrics()
+        self.hooks: RequestHooks = hooks if hooks is not None else RequestHooks()
+        # responses are only cached with a cache policy
+        self.cache: ResponseCache | None = ResponseCache(cache_policy) if cache_policy is not None else None
+        # aiohttp sessions are bound to the event loop they were created on, so the pool is kept per loop
+        self._sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        close_on_shutdown(self)
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if not k.startswith("_"))
         return f"{self.__class__.__name__}({attrs})"
 
     def __str__(self) -> str:
         return self.__repr__()
 
+    @property
+    def url(self) -> str:
+        return f"{self._BASE_URL}:{self.port}"
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            for session_loop in [session_loop for session_loop in self._sessions if session_loop.is_closed()]:
+                await self._close_session(self._sessions.pop(session_loop), session_loop)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_limits.limit,
+                    keepalive_timeout=self.pool_limits.keepalive_timeout,
+                )
+            )
+            self._sessions[loop] = session
+        return session
+
     @callable_from_sync_or_async_context
-    async def post_command(self, command: str, parameters: dict | None = None) -> dict[str, Any]:
-        if parameters is None:
-            parameters = {}
-        url = f"{self._BASE_URL:}:{self.port}"
-        json_str = json.dumps({"command": command, "parameters": parameters}).encode("utf8")
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=json.loads(json_str)) as response:
-                result = await response.text()
-                return json.loads(result)
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        await asyncio.gather(*(self._close_session(session, loop) for loop, session in sessions.items()))
+
+    @staticmethod
+    async def _close_session(session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop) -> None:
+        if loop.is_closed():
+            # the transports died with the loop, closing only marks the session closed, so it can be done from any loop
+            await session.close()
+        else:
+            await run_on_loop(session.close(), loop)
 
+    # With fresh=True a cached response is not used, and the cache is updated with the new one
     @callable_from_sync_or_async_context
-    async def post_tapir_command(self, command: str, parameters: dict | None = None) -> dict[str, Any]:
+    async def post_command(
+        self, command: str, parameters: dict | None = None, priority: Priority = Priority.NORMAL, fresh: bool = False
+    ) -> dict[str, Any]:
+        return await self._post(command, parameters, priority, fresh)
+
+    @callable_from_sync_or_async_context
+    async def post_tapir_command(
+        self, command: str, parameters: dict | None = None, priority: Priority = Priority.NORMAL, fresh: bool = False
+    ) -> dict[str, Any]:
+        return await self._post("API.ExecuteAddOnCommand", self._tapir_parameters(command, parameters), priority, fresh)
+
+    @callable_from_sync_or_async_context
+    async def post_batch(
+        self, commands: Sequence[BatchCommand], max_in_flight: int = 4, priority: Priority = Priority.NORMAL
+    ) -> list[dict[str, Any] | APIResponseError]:
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def post(command: str, parameters: dict | None) -> dict[str, Any] | APIResponseError:
+            async with semaphore:
+                try:
+                    result = await self._post_any(command, parameters, priority)
+                except (aiohttp.ClientError, TimeoutError, CircuitOpenError, ValueError) as e:
+                    return APIResponseError(code=TRANSPORT_ERROR_CODE, message=f"{type(e).__name__}: {e}")
+            if self._has_succeeded(result):
+                return result
+            # Tapir reports its errors in the response of the add-on command
+            return APIResponseError.from_api_response(
+                result["result"]["addOnCommandResponse"] if result.get("succeeded") else result
+            )
+
+        return list(await asyncio.gather(*(post(command, parameters) for command, parameters in commands)))
+
+    # Splits the list parameters of a large command into chunks of chunk_size, and returns the responses merged in
+    # the order of the chunks, as if the command was sent at once. Lists in the results are concatenated, other
+    # values are taken from the first chunk. If a chunk fails its response is returned, and when the chunks are
+    # sent one after the other the rest of them are not sent.
+    @callable_from_sync_or_async_context
+    async def post_chunked(
+        self,
+        command: str,
+        parameters: dict[str, Any],
+        chunk_size: int = 1000,
+        chunked_command: ChunkedCommand | None = None,
+        max_in_flight: int | None = None,
+        priority: Priority = Priority.NORMAL,
+    ) -> dict[str, Any]:
+        if chunked_command is None:
+            if command not in CHUNKED_COMMANDS:
+                raise ValueError(f"No list parameters are known for {command}, pass chunked_command")
+            chunked_command = CHUNKED_COMMANDS[command]
+        if max_in_flight is None:
+            max_in_flight = 4 if chunked_command.parallel else 1
+        chunks = self._split_parameters(parameters, chunked_command.list_parameters, chunk_size)
+        semaphore = asyncio.Semaphore(max_in_flight)
+        failed = asyncio.Event()
+
+        async def post(chunk: dict[str, Any]) -> dict[str, Any] | None:
+            async with semaphore:
+                if failed.is_set() and max_in_flight == 1:
+                    return None
+                result = await self._post_any(command, chunk, priority)
+                if not self._has_succeeded(result):
+                    failed.set()
+                return result
+
+        results = [result for result in await asyncio.gather(*(post(chunk) for chunk in chunks)) if result is not None]
+        for result in results:
+            if not self._has_succeeded(result):
+                return result
+        return self._merge_results(results)
+
+    @staticmethod
+    def _split_parameters(
+        parameters: dict[str, Any], list_parameters: Sequence[str], chunk_size: int
+    ) -> list[dict[str, Any]]:
+        lengths = {len(parameters[key]) for key in list_parameters if key in parameters}
+        if len(lengths) > 1:
+            raise ValueError(f"The parameters {', '.join(list_parameters)} must have the same length")
+        length = lengths.pop() if lengths else 0
+        if length <= chunk_size:
+            return [parameters]
+        return [
+            parameters
+            | {key: parameters[key][start : start + chunk_size] for key in list_parameters if key in parameters}
+            for start in range(0, length, chunk_size)
+        ]
+
+    @staticmethod
+    def _has_succeeded(result: dict[str, Any]) -> bool:
+        if not result.get("succeeded"):
+            return False
+        tapir_result = result.get("result", {}).get("addOnCommandResponse")
+        return not (isinstance(tapir_result, dict) and "error" in tapir_result)
+
+    @classmethod
+    def _merge_results(cls, results: list[Any]) -> Any:
+        first = results[0]
+        if isinstance(first, dict):
+            return {
+                key: cls._merge_results(
+                    [result[key] for result in results if isinstance(result, dict) and key in result]
+                )
+                for key in first
+            }
+        if isinstance(first, list):
+            return [item for result in results for item in result]
+        return first
+
+    # The streaming methods yield the items of a list in the result (e.g. "elements") as they arrive, without
+    # holding the whole response in memory. They are async generators, so they can only be used with async for.
+    def stream_command(
+        self,
+        command: str,
+        parameters: dict | None = None,
+        items: str | Sequence[str] = (),
+        chunk_size: int = 2**16,
+        priority: Priority = Priority.NORMAL,
+    ) -> AsyncIterator[Any]:
+        return self._stream(command, parameters, ("result", *self._item_path(items)), chunk_size, priority)
+
+    def stream_tapir_command(
+        self,
+        command: str,
+        parameters: dict | None = None,
+        items: str | Sequence[str] = (),
+        chunk_size: int = 2**16,
+        priority: Priority = Priority.NORMAL,
+    ) -> AsyncIterator[Any]:
+        return self._stream(
+            "API.ExecuteAddOnCommand",
+            self._tapir_parameters(command, parameters),
+            ("result", "addOnCommandResponse", *self._item_path(items)),
+            chunk_size,
+            priority,
+        )
+
+    async def _stream(
+        self, command: str, parameters: dict | None, path: tuple[str, ...], chunk_size: int, priority: Priority
+    ) -> AsyncIterator[Any]:
+        stream = JsonArrayStream(path)
+        command_name = self._command_name(command, parameters or {})
+        data = self.serializer.encode({"command": command, "parameters": parameters if parameters is not None else {}})
+        info = RequestInfo(command=command_name, port=self.port, request_bytes=len(data)) if self.hooks else None
+        if info is not None:
+            await self.hooks.call_before(info)
+        try:
+            # streamed responses are not retried, and the timeout applies to each read instead of the whole response
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=self.request_policy.timeout_of(command_name))
+            session = await self.get_session()
+            self.circuit_breaker.before_request()
+            # the slot is held until the whole response is read, Archicad is busy with the request until then
+            # the latency of a streamed response includes the time the caller spends with the items
+            response_bytes, decode = 0, 0.0
+            async with self.scheduler.slot(priority):
+                with self.metrics.in_flight(self.port):
+                    start = time.perf_counter()
+                    try:
+                        async with session.post(
+                            self.url, data=data, headers=self._HEADERS, timeout=timeout
+                        ) as response:
+                            async for chunk in response.content.iter_chunked(chunk_size):
+                                response_bytes += len(chunk)
+                                feed_start = time.perf_counter()
+                                items = stream.feed(chunk)
+                                decode += time.perf_counter() - feed_start
+                                for item in items:
+                                    yield item
+                    except (aiohttp.ClientError, TimeoutError) as e:
+                        self.circuit_breaker.record_failure()
+                        self.metrics.record_transport_error(self.port, command_name, len(data), e)
+                        raise
+                    latency = time.perf_counter() - start
+            self.circuit_breaker.record_success()
+            # without the items the rest of the response is small, errors can only be detected once it is complete
+            result = stream.close()
+            self.metrics.record_response(self.port, command_name, latency, len(data), response_bytes, decode, result)
+            if not result.get("succeeded"):
+                error = APIResponseError.from_api_response(result)
+                raise CommandFailedError(error.code, error.message)
+            if path[:2] == ("result", "addOnCommandResponse"):
+                tapir_result = result["result"].get("addOnCommandResponse")
+                if isinstance(tapir_result, dict) and "error" in tapir_result:
+                    error = APIResponseError.from_api_response(tapir_result)
+                    raise CommandFailedError(error.code, error.message)
+            if not stream.found:
+                raise CommandFailedError(TRANSPORT_ERROR_CODE, f"The response has no list at {'.'.join(path)}")
+        except Exception as e:
+            if info is not None:
+                info.finish()
+                await self.hooks.call_error(info, e)
+            raise
+        if info is not None:
+            info.finish()
+            await self.hooks.call_after(info, result)
+
+    @staticmethod
+    def _item_path(items: str | Sequence[str]) -> tuple[str, ...]:
+        return (items,) if isinstance(items, str) else tuple(items)
+
+    async def _post(
+        self, command: str, parameters: dict | None = None, priority: Priority = Priority.NORMAL, fresh: bool = False
+    ) -> dict[str, Any]:
         if parameters is None:
             parameters = {}
-        return await cast(
-            Awaitable[dict[str, Any]],
-            self.post_command(
-                command="API.ExecuteAddOnCommand",
-                parameters={
-                    "addOnCommandId": {
-                        "commandNamespace": "TapirCommand",
-                        "commandName": command,
-                    },
-                    "addOnCommandParameters": parameters,
-                },
-            ),
-        )
+        # the request is serialized once, and the response is decoded from the raw bytes
+        data = self.serializer.encode({"command": command, "parameters": parameters})
+        name = self._command_name(command, parameters)
+        if self.cache is None:
+            return await self._send(name, data, priority)
+        return await self._send_cached(self.cache, name, data, parameters, priority, fresh)
+
+    # Sends an already serialized request, command is only used to look up its timeout, retry and cache policy
+    async def post_json(self, command: str, data: bytes, priority: Priority = Priority.NORMAL) -> dict[str, Any]:
+        if self.cache is None:
+            return await self._send(command, data, priority)
+        return await self._send_cached(self.cache, command, data, data, priority, fresh=False)
+
+    async def _send_cached(
+        self,
+        cache: ResponseCache,
+        name: str,
+        data: bytes,
+        parameters: dict[str, Any] | bytes,
+        priority: Priority,
+        fresh: bool,
+    ) -> dict[str, Any]:
+        if not cache.policy.is_cacheable(name):
+            # the command may have modified the project even if its response was lost
+            try:
+                return await self._send(name, data, priority)
+            finally:
+                if cache.policy.invalidates(name):
+                    cache.clear()
+        key = cache.key(name, parameters)
+        if not fresh and (response := cache.get(key)) is not None:
+            return self.serializer.decode(response)
+        result = await self._send(name, data, priority)
+        if self._has_succeeded(result):
+            cache.put(key, self.serializer.encode(result))
+        return result
+
+    async def _send(self, name: str, data: bytes, priority: Priority) -> dict[str, Any]:
+        if not self.hooks:
+            return await self._send_with_retries(name, data, priority)
+        info = RequestInfo(command=name, port=self.port, request_bytes=len(data))
+        await self.hooks.call_before(info)
+        try:
+            result = await self._send_with_retries(name, data, priority)
+        except Exception as e:
+            info.finish()
+            await self.hooks.call_error(info, e)
+            raise
+        info.finish()
+        await self.hooks.call_after(info, result)
+        return result
+
+    async def _send_with_retries(self, name: str, data: bytes, priority: Priority) -> dict[str, Any]:
+        policy = self.request_policy
+        timeout = aiohttp.ClientTimeout(total=policy.timeout_of(name))
+        session = await self.get_session()
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_request()
+            try:
+                async with self.scheduler.slot(priority):
+                    with self.metrics.in_flight(self.port):
+                        start = time.perf_counter()
+                        async with session.post(
+                            self.url, data=data, headers=self._HEADERS, timeout=timeout
+                        ) as response:
+                            body = await response.read()
+                        latency = time.perf_counter() - start
+            except (aiohttp.ClientError, TimeoutError) as e:
+                self.circuit_breaker.record_failure()
+                self.metrics.record_transport_error(self.port, name, len(data), e)
+                if attempt >= policy.retries or not policy.is_retryable(name, e):
+                    raise
+                await asyncio.sleep(policy.backoff_delay(attempt))
+                attempt += 1
+                continue
+            self.circuit_breaker.record_success()
+            start = time.perf_counter()
+            result = self.serializer.decode(body)
+            decode = time.perf_counter() - start
+            self.metrics.record_response(self.port, name, latency, len(data), len(body), decode, result)
+            return result
+
+    # Commands starting with "API." are sent as official commands, everything else as a Tapir command
+    async def _post_any(self, command: str, parameters: dict | None, priority: Priority) -> dict[str, Any]:
+        if command.startswith("API."):
+            return await self._post(command, parameters, priority)
+        return await self._post("API.ExecuteAddOnCommand", self._tapir_parameters(command, parameters), priority)
+
+    @staticmethod
+    def _command_name(command: str, parameters: dict[str, Any]) -> str:
+        if command == "API.ExecuteAddOnCommand":
+            return parameters.get("addOnCommandId", {}).get("commandName", command)
+        return command
+
+    @staticmethod
+    def _tapir_parameters(command: str, parameters: dict | None = None) -> dict[str, Any]:
+        return {
+            "addOnCommandId": {
+                "commandNamespace": "TapirCommand",
+                "commandName": command,
+            },
+            "addOnCommandParameters": parameters if parameters is not None else {},
+        }
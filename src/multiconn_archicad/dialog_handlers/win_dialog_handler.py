@@ -1,5 +1,6 @@
 import contextlib
 import io
+import logging
 from pywinauto import Application, WindowSpecification, timings
 from pywinauto.controls.uiawrapper import UIAWrapper
 import subprocess
@@ -9,6 +10,8 @@ from typing import Callable
 
 from .dialog_handler_base import DialogHandlerBase, UnhandledDialogError
 
+log = logging.getLogger(__name__)
+
 
 class WinDialogHandler(DialogHandlerBase):
     def __init__(self, handler_factory: dict[str, Callable[[UIAWrapper], None]]):
@@ -42,15 +45,15 @@ class WinDialogHandler(DialogHandlerBase):
                         # Sometimes _is_project_window_ready returns True even when the window is not ready.
                         # .print_control_identifiers() more reliably fails in these cases.
                         project_window.print_control_identifiers()
-                    print("Project window loaded.")
+                    log.info("Project window loaded", extra={"pid": self.application.process})
                     break
             except Exception as e:
                 # catching a private exception : _ctypes.COMError: (-2147220991, 'An event was unable to invoke any of
                 # the subscribers', (None, None, None, 0, None))
-                print(f"Cauth exception: {e}. Trying again.")
+                log.debug("Caught exception while waiting for the project window: %r. Trying again.", e)
         time.sleep(1)
         project_window.set_focus()
-        print("setting focus")
+        log.debug("Setting focus on the project window")
         return project_window
 
     def _handle_dialogs(self, project_window: WindowSpecification) -> bool:
@@ -80,7 +83,7 @@ class WinDialogHandler(DialogHandlerBase):
         title = dialog.window_text()
         match = self._match_handler(title)
         if match:
-            print(f"Handling dialog: {title}")
+            log.info("Handling dialog: %s", title, extra={"dialog_title": title, "handler": match})
             self.dialog_handlers[match](dialog)
             self._wait_and_handle_dialogs()
             return True
@@ -1,16 +1,27 @@
 class ProjectAlreadyOpenError(Exception):
     """Raised when the project is already open."""
 
-    pass
-
 
 class ProjectNotFoundError(Exception):
     """Raised when the project file is not found."""
 
-    pass
-
 
 class NotFullyInitializedError(Exception):
     """Raised when the parameter is not fully initialized"""
 
-    pass
+
+class PortDiscoveryTimeoutError(TimeoutError):
+    """Raised when a started Archicad instance does not start listening in time."""
+
+
+class CommandFailedError(Exception):
+    """Raised when a command streamed from Archicad, or a property id lookup reports an error."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code}: {message}")
+        self.code: int = code
+        self.message: str = message
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to an instance that has stopped responding."""
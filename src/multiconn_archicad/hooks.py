@@ -0,0 +1,137 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from multiconn_archicad.basic_types import Port
+from multiconn_archicad.utilities.async_utils import get_runtime_loop, is_runtime_thread, run_async
+
+log = logging.getLogger(__name__)
+
+BeforeHook = Callable[["RequestInfo"], Awaitable[None] | None]
+AfterHook = Callable[["RequestInfo", Any], Awaitable[None] | None]
+ErrorHook = Callable[["RequestInfo", BaseException], Awaitable[None] | None]
+
+
+@dataclass
+class RequestInfo:
+    """A command dispatch, passed to every hook of the dispatch. Hooks can keep their own state of the dispatch in
+    context, e.g. the span started by the before hook and ended by the after hook."""
+
+    command: str
+    port: Port | None
+    # None when the request is serialized by the official wrapper
+    request_bytes: int | None
+    start: float = field(default_factory=time.perf_counter)
+    # seconds until the result or the error, set before the after and error hooks are called
+    duration: float | None = None
+    context: dict[str, Any] = field(default_factory=dict)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.start
+
+
+class RequestHooks:
+    """Functions called before every command dispatch, and after it returned a result or raised. Hooks can be plain
+    or async functions, and are called in the order they were added. Exceptions of hooks are not caught.
+
+    Without hooks the dispatch only checks whether there are any.
+    """
+
+    def __init__(self) -> None:
+        self.before: list[BeforeHook] = []
+        self.after: list[AfterHook] = []
+        self.error: list[ErrorHook] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(before={len(self.before)}, after={len(self.after)}, error={len(self.error)})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def __bool__(self) -> bool:
+        return bool(self.before or self.after or self.error)
+
+    # The add methods return the hook, so they can be used as decorators
+    def add_before(self, hook: BeforeHook) -> BeforeHook:
+        self.before.append(hook)
+        return hook
+
+    def add_after(self, hook: AfterHook) -> AfterHook:
+        self.after.append(hook)
+        return hook
+
+    def add_error(self, hook: ErrorHook) -> ErrorHook:
+        self.error.append(hook)
+        return hook
+
+    def remove(self, hook: Callable[..., Any]) -> None:
+        for hooks in (self.before, self.after, self.error):
+            if hook in hooks:
+                hooks.remove(hook)  # type: ignore[arg-type]
+
+    def clear(self) -> None:
+        self.before.clear()
+        self.after.clear()
+        self.error.clear()
+
+    async def call_before(self, info: RequestInfo) -> None:
+        for hook in list(self.before):
+            result = hook(info)
+            if inspect.isawaitable(result):
+                await result
+
+    async def call_after(self, info: RequestInfo, result: Any) -> None:
+        for hook in list(self.after):
+            returned = hook(info, result)
+            if inspect.isawaitable(returned):
+                await returned
+
+    async def call_error(self, info: RequestInfo, error: BaseException) -> None:
+        for hook in list(self.error):
+            returned = hook(info, error)
+            if inspect.isawaitable(returned):
+                await returned
+
+    # Used by the blocking official wrapper, async hooks are run on the runtime loop. Commands called on the runtime
+    # thread can not block it, so their async hooks are scheduled on it, and run after the command returned.
+    def call_before_sync(self, info: RequestInfo) -> None:
+        for hook in list(self.before):
+            _wait(hook(info))
+
+    def call_after_sync(self, info: RequestInfo, result: Any) -> None:
+        for hook in list(self.after):
+            _wait(hook(info, result))
+
+    def call_error_sync(self, info: RequestInfo, error: BaseException) -> None:
+        for hook in list(self.error):
+            _wait(hook(info, error))
+
+
+# hooks scheduled on the runtime loop, kept until they are done
+_scheduled: set[asyncio.Task[None]] = set()
+
+
+def _wait(returned: Awaitable[None] | None) -> None:
+    if returned is None or not inspect.isawaitable(returned):
+        return
+    if is_runtime_thread():
+        task = get_runtime_loop().create_task(_await(returned))
+        _scheduled.add(task)
+        task.add_done_callback(_scheduled_done)
+    else:
+        run_async(_await(returned))
+
+
+async def _await(awaitable: Awaitable[None]) -> None:
+    await awaitable
+
+
+# Nothing awaits the scheduled hooks, so their exceptions are logged
+def _scheduled_done(task: asyncio.Task[None]) -> None:
+    _scheduled.discard(task)
+    if not task.cancelled() and (error := task.exception()) is not None:
+        log.warning("Hook scheduled on the runtime loop failed: %s", error, exc_info=error)
@@ -0,0 +1,280 @@
+import bisect
+import contextlib
+import copy
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any, ClassVar
+
+from aiohttp import web
+
+from multiconn_archicad.basic_types import Port
+from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
+
+# Upper bounds of the histogram buckets in seconds, the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class Histogram:
+    """Counts of the observed values per bucket. counts[i] is the number of values in (buckets[i - 1], buckets[i]],
+    the last count is the number of values over the last bound."""
+
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    # Upper bound of the bucket the quantile falls into
+    def quantile(self, q: float) -> float:
+        rank, cumulative = q * self.count, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            if cumulative >= rank and cumulative:
+                return bound
+        return 0.0
+
+
+@dataclass
+class CommandMetrics:
+    """Requests of one command sent to one port. latency is the time from sending the request until the whole
+    response is received, decode is the time spent decoding the response."""
+
+    latency: Histogram = field(default_factory=Histogram)
+    decode: Histogram = field(default_factory=Histogram)
+    requests: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    # responses with an error, by the code of the error
+    error_codes: Counter[int] = field(default_factory=Counter)
+    # requests without a response, by the name of the exception
+    transport_errors: Counter[str] = field(default_factory=Counter)
+
+
+@dataclass
+class MetricsSnapshot:
+    commands: dict[tuple[Port, str], CommandMetrics] = field(default_factory=dict)
+    in_flight: dict[Port, int] = field(default_factory=dict)
+    scans: Histogram = field(default_factory=Histogram)
+
+
+class MetricsRegistry:
+    """Collects the metrics of the requests sent by CoreCommands and of the port scans of MultiConn. Collecting is
+    off until enable() is called, then it is shared by every connection of the process."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled: bool = False
+        self.buckets: tuple[float, ...] = buckets
+        self._data: MetricsSnapshot = MetricsSnapshot(scans=Histogram(buckets))
+        self._lock: threading.Lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(enabled={self.enabled}, commands={len(self._data.commands)})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data = MetricsSnapshot(scans=Histogram(self.buckets))
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    @contextlib.contextmanager
+    def in_flight(self, port: Port) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            self._data.in_flight[port] = self._data.in_flight.get(port, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._data.in_flight[port] -= 1
+
+    def record_response(
+        self,
+        port: Port,
+        command: str,
+        latency: float,
+        request_bytes: int,
+        response_bytes: int,
+        decode: float,
+        response: Any,
+    ) -> None:
+        if not self.enabled:
+            return
+        code = self._error_code(response)
+        with self._lock:
+            metrics = self._command(port, command)
+            metrics.latency.observe(latency)
+            metrics.decode.observe(decode)
+            metrics.requests += 1
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            if code is not None:
+                metrics.error_codes[code] += 1
+
+    def record_transport_error(self, port: Port, command: str, request_bytes: int, error: BaseException) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            metrics = self._command(port, command)
+            metrics.requests += 1
+            metrics.request_bytes += request_bytes
+            metrics.transport_errors[type(error).__name__] += 1
+
+    def record_scan(self, duration: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data.scans.observe(duration)
+
+    def _command(self, port: Port, command: str) -> CommandMetrics:
+        metrics = self._data.commands.get((port, command))
+        if metrics is None:
+            metrics = CommandMetrics(latency=Histogram(self.buckets), decode=Histogram(self.buckets))
+            self._data.commands[(port, command)] = metrics
+        return metrics
+
+    # Code of the error of a failed official command, or of the error returned by a Tapir command
+    @staticmethod
+    def _error_code(response: Any) -> int | None:
+        if not isinstance(response, dict):
+            return None
+        if not response.get("succeeded", True):
+            return response.get("error", {}).get("code")
+        tapir_result = response.get("result", {}).get("addOnCommandResponse") if "result" in response else None
+        if isinstance(tapir_result, dict) and "error" in tapir_result:
+            return tapir_result["error"].get("code")
+        return None
+
+    def to_prometheus(self) -> str:
+        data = self.snapshot()
+        lines: list[str] = []
+
+        def header(name: str, kind: str, description: str) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, values: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip((*values.buckets, float("inf")), values.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{_braces(labels)} {values.sum!r}")
+            lines.append(f"{name}_count{_braces(labels)} {values.count}")
+
+        commands = sorted(data.commands.items(), key=lambda item: item[0])
+        header("multiconn_request_duration_seconds", "histogram", "Time until the whole response is received.")
+        for (port, command), metrics in commands:
+            histogram("multiconn_request_duration_seconds", _labels(port, command), metrics.latency)
+        header("multiconn_response_decode_seconds", "histogram", "Time spent decoding the response.")
+        for (port, command), metrics in commands:
+            histogram("multiconn_response_decode_seconds", _labels(port, command), metrics.decode)
+        for name, attribute, description in (
+            ("multiconn_requests_total", "requests", "Requests sent."),
+            ("multiconn_request_bytes_total", "request_bytes", "Bytes of the requests sent."),
+            ("multiconn_response_bytes_total", "response_bytes", "Bytes of the responses received."),
+        ):
+            header(name, "counter", description)
+            for (port, command), metrics in commands:
+                lines.append(f"{name}{{{_labels(port, command)}}} {getattr(metrics, attribute)}")
+        header("multiconn_response_errors_total", "counter", "Responses with an error, by error code.")
+        for (port, command), metrics in commands:
+            for code, count in sorted(metrics.error_codes.items()):
+                lines.append(f'multiconn_response_errors_total{{{_labels(port, command)},code="{code}"}} {count}')
+        header("multiconn_transport_errors_total", "counter", "Requests without a response, by exception.")
+        for (port, command), metrics in commands:
+            for error, count in sorted(metrics.transport_errors.items()):
+                lines.append(f'multiconn_transport_errors_total{{{_labels(port, command)},error="{error}"}} {count}')
+        header("multiconn_requests_in_flight", "gauge", "Requests sent and waiting for a response.")
+        for port, count in sorted(data.in_flight.items()):
+            lines.append(f'multiconn_requests_in_flight{{port="{port}"}} {count}')
+        header("multiconn_scan_duration_seconds", "histogram", "Duration of the port scans.")
+        histogram("multiconn_scan_duration_seconds", "", data.scans)
+        return "\n".join(lines) + "\n"
+
+
+def _braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _labels(port: Port, command: str) -> str:
+    command = command.replace("\\", "\\\\").replace('"', '\\"')
+    return f'port="{port}",command="{command}"'
+
+
+class MetricsServer:
+    """Serves the metrics of a registry in the Prometheus text format at http://host:port/metrics. Started from sync
+    code, it runs on the event loop of the runtime thread."""
+
+    def __init__(self, registry: "MetricsRegistry", host: str = "127.0.0.1", port: int = 9464) -> None:
+        self.registry: MetricsRegistry = registry
+        self.host: str = host
+        self.port: int = port
+        self._runner: web.AppRunner | None = None
+
+    _HEADERS: ClassVar[dict[str, str]] = {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(url=http://{self.host}:{self.port}/metrics, running={self.running})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    @callable_from_sync_or_async_context
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        self._runner = runner
+
+    @callable_from_sync_or_async_context
+    async def stop(self) -> None:
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            await runner.cleanup()
+
+    async def _handle(self, _: web.Request) -> web.Response:
+        return web.Response(body=self.registry.to_prometheus().encode("utf-8"), headers=self._HEADERS)
+
+
+_registry: MetricsRegistry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """The registry used by every connection that was not given one."""
+    return _registry
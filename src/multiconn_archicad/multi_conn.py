@@ -1,29 +1,71 @@
 import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
 import aiohttp
-from typing import cast, Awaitable
+from typing import cast, Awaitable, Self, Any, Iterable, Sequence
 from pprint import pformat
 
-from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
-from multiconn_archicad.core_commands import CoreCommands
+from multiconn_archicad.utilities.async_utils import (
+    callable_from_sync_or_async_context,
+    is_runtime_thread,
+    run_in_sync_or_async_context,
+)
+from multiconn_archicad.core_commands import CoreCommands, PoolLimits, BatchCommand, RequestPolicy
 from multiconn_archicad.standard_connection import StandardConnection
+from multiconn_archicad.async_standard_connection import AsyncStandardConnection
 from multiconn_archicad.conn_header import ConnHeader, Status
-from multiconn_archicad.basic_types import Port, APIResponseError, ProductInfo, ArchiCadID, ArchicadLocation
-from multiconn_archicad.actions import Connect, Disconnect, Refresh, QuitAndDisconnect, FindArchicad, OpenProject
+from multiconn_archicad.basic_types import Port, APIResponseError, ProductInfo, ScanDiff
+from multiconn_archicad.actions import Connect, Disconnect, Refresh, QuitAndDisconnect, FindArchicad, OpenProject, RunOn
 from multiconn_archicad.dialog_handlers import DialogHandlerBase, EmptyDialogHandler
+from multiconn_archicad.errors import CircuitOpenError
+from multiconn_archicad.hooks import RequestHooks
+from multiconn_archicad.property_ids import PropertyIdResolver
+from multiconn_archicad.response_cache import CachePolicy
+from multiconn_archicad.metrics import get_metrics
+from multiconn_archicad.scheduler import Priority
+from multiconn_archicad.watcher import InstanceWatcher
+
+log = logging.getLogger(__name__)
 
 
 class MultiConn:
     _base_url: str = "http://127.0.0.1"
     _port_range: list[Port] = [Port(port) for port in range(19723, 19744)]
 
-    def __init__(self, dialog_handler: DialogHandlerBase = EmptyDialogHandler()) -> None:
-        self.open_port_headers: dict[Port, ConnHeader] = {}
+    def __init__(
+        self,
+        dialog_handler: DialogHandlerBase | None = None,
+        pool_limits: PoolLimits | None = None,
+        request_policy: RequestPolicy | None = None,
+        lazy: bool = False,
+        hooks: RequestHooks | None = None,
+        cache_policy: CachePolicy | None = None,
+        property_ids: PropertyIdResolver | None = None,
+    ) -> None:
+        self._open_port_headers: dict[Port, ConnHeader] = {}
         self._primary: ConnHeader | None = None
-        self.dialog_handler: DialogHandlerBase = dialog_handler
+        self.lazy: bool = lazy
+        # in lazy mode the port range is scanned on the first access, even if the primary was chosen before it
+        self._first_scan_pending: bool = True
+        # the first scan in progress, awaited by the coroutines that need the headers meanwhile
+        self._first_scan: concurrent.futures.Future[None] | None = None
+        self._first_scan_lock: threading.Lock = threading.Lock()
+        self.dialog_handler: DialogHandlerBase = dialog_handler if dialog_handler is not None else EmptyDialogHandler()
+        self.pool_limits: PoolLimits = pool_limits if pool_limits is not None else PoolLimits()
+        self.request_policy: RequestPolicy = request_policy if request_policy is not None else RequestPolicy()
+        # shared by the headers of every instance
+        self.hooks: RequestHooks = hooks if hooks is not None else RequestHooks()
+        # every instance gets its own cache with this policy
+        self.cache_policy: CachePolicy | None = cache_policy
+        # built-in property ids, resolved once per Archicad version and build for the headers of every instance
+        self.property_ids: PropertyIdResolver = property_ids if property_ids is not None else PropertyIdResolver()
 
         # command namespaces of new_value
         self.core: CoreCommands | type[CoreCommands] = CoreCommands
         self.standard: StandardConnection | type[StandardConnection] = StandardConnection
+        self.async_standard: AsyncStandardConnection | type[AsyncStandardConnection] = AsyncStandardConnection
 
         # load actions
         self.connect: Connect = Connect(self)
@@ -32,9 +74,46 @@ class MultiConn:
         self.refresh: Refresh = Refresh(self)
         self.find_archicad: FindArchicad = FindArchicad(self)
         self.open_project: OpenProject = OpenProject(self)
+        self.run_on: RunOn = RunOn(self)
+
+        self.watcher: InstanceWatcher = InstanceWatcher(self)
+
+        if not lazy:
+            self.refresh.all_ports()
+
+    @classmethod
+    async def create(
+        cls,
+        dialog_handler: DialogHandlerBase | None = None,
+        pool_limits: PoolLimits | None = None,
+        request_policy: RequestPolicy | None = None,
+        hooks: RequestHooks | None = None,
+        cache_policy: CachePolicy | None = None,
+        property_ids: PropertyIdResolver | None = None,
+    ) -> Self:
+        instance = cls(
+            dialog_handler,
+            pool_limits,
+            request_policy,
+            lazy=True,
+            hooks=hooks,
+            cache_policy=cache_policy,
+            property_ids=property_ids,
+        )
+        await instance.refresh.execute_action(instance.port_range)
+        return instance
+
+    # In lazy mode the port range is scanned on the first access. Coroutines of the runtime loop can not wait for the
+    # scan without blocking it, so they see the headers as they are, and await _ensure_scanned() before reading them.
+    @property
+    def open_port_headers(self) -> dict[Port, ConnHeader]:
+        if self.lazy and self._first_scan_pending and not is_runtime_thread():
+            run_in_sync_or_async_context(self._ensure_scanned)
+        return self._open_port_headers
 
-        self.refresh.all_ports()
-        self._set_primary()
+    @open_port_headers.setter
+    def open_port_headers(self, new_value: dict[Port, ConnHeader]) -> None:
+        self._open_port_headers = new_value
 
     @property
     def pending(self) -> dict[Port, ConnHeader]:
@@ -54,7 +133,7 @@ class MultiConn:
 
     @property
     def closed_ports(self) -> list[Port]:
-        return [port for port in self._port_range if port not in self.open_port_headers.keys()]
+        return [port for port in self._port_range if port not in self.open_port_headers]
 
     @property
     def port_range(self) -> list[Port]:
@@ -62,6 +141,8 @@ class MultiConn:
 
     @property
     def primary(self) -> ConnHeader | None:
+        if self.lazy and self._first_scan_pending and self._primary is None:
+            _ = self.open_port_headers
         return self._primary
 
     @primary.setter
@@ -76,6 +157,31 @@ class MultiConn:
         attrs = {name: getattr(self, name) for name in ["pending", "active", "failed", "primary", "dialog_handler"]}
         return f"{self.__class__.__name__}(\n{pformat(attrs, indent=4)})"
 
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await cast(Awaitable[None], self.close())
+
+    def watch(self, min_interval: float | None = None, max_interval: float | None = None) -> InstanceWatcher:
+        if min_interval is not None:
+            self.watcher.min_interval = min_interval
+        if max_interval is not None:
+            self.watcher.max_interval = max_interval
+        self.watcher.start()
+        return self.watcher
+
+    @callable_from_sync_or_async_context
+    async def close(self) -> None:
+        self.watcher.stop()
+        await asyncio.gather(*(cast(Awaitable[None], header.close()) for header in self._open_port_headers.values()))
+
     def get_all_port_headers_with_status(self, status: Status) -> dict[Port, ConnHeader]:
         return {
             conn_header.port: conn_header
@@ -83,45 +189,133 @@ class MultiConn:
             if conn_header.status == status and conn_header.port
         }
 
-    async def scan_ports(self, ports: list[Port]) -> None:
+    @callable_from_sync_or_async_context
+    async def post_batch(
+        self,
+        commands: Sequence[BatchCommand],
+        ports: Iterable[Port] | None = None,
+        max_in_flight: int = 4,
+        priority: Priority = Priority.NORMAL,
+    ) -> dict[Port, list[dict[str, Any] | APIResponseError]]:
+        await self._ensure_scanned()
+        headers = (
+            self.open_port_headers
+            if ports is None
+            else {port: self.open_port_headers[port] for port in ports if port in self.open_port_headers}
+        )
+        results = await asyncio.gather(
+            *(
+                cast(
+                    Awaitable[list[dict[str, Any] | APIResponseError]],
+                    header.core.post_batch(commands, max_in_flight, priority),
+                )
+                for header in headers.values()
+            )
+        )
+        return dict(zip(headers.keys(), results))
+
+    # Scans the port range of a lazy MultiConn, unless it was already scanned. Concurrent callers wait for the same
+    # scan, and scan again if it failed or was cancelled.
+    async def _ensure_scanned(self) -> None:
+        while self.lazy and self._first_scan_pending:
+            with self._first_scan_lock:
+                first_scan, owner = self._first_scan, self._first_scan is None
+                if first_scan is None:
+                    first_scan = self._first_scan = concurrent.futures.Future()
+            if not owner:
+                await asyncio.wait([asyncio.wrap_future(first_scan)])
+                continue
+            try:
+                await self.refresh.execute_action(self.port_range)
+            finally:
+                with self._first_scan_lock:
+                    self._first_scan = None
+                first_scan.set_result(None)
+
+    async def scan_ports(self, ports: list[Port], incremental: bool = False) -> ScanDiff:
+        # only a scan of the whole port range counts as the first scan, scans of single ports do not replace it
+        first_scan = self._first_scan_pending and set(self._port_range) <= set(ports)
+        start = time.perf_counter()
         async with aiohttp.ClientSession() as session:
-            tasks = [self.check_port(session, port) for port in ports]
-            await asyncio.gather(*tasks)
+            tasks = [self.check_port(session, port, incremental) for port in ports]
+            results = await asyncio.gather(*tasks)
+        get_metrics().record_scan(time.perf_counter() - start)
+        diff = await self._apply_scan_results(dict(zip(ports, results)))
+        if first_scan:
+            # cleared only once the headers are applied, so readers do not see the empty headers meanwhile
+            self._first_scan_pending = False
+            if self._primary is None:
+                await self._set_primary_from_none()
+        return diff
 
-    async def check_port(self, session: aiohttp.ClientSession, port: Port) -> None:
+    # Returns the header of the instance running on the port (None if the port is closed), and whether its product or
+    # project changed. In incremental mode known instances are not probed, only their product and project info is
+    # requested, and the rest of the header is fetched only if those changed.
+    async def check_port(
+        self, session: aiohttp.ClientSession, port: Port, incremental: bool = False
+    ) -> tuple[ConnHeader | None, bool]:
+        header = self._open_port_headers.get(port)
+        if incremental and header:
+            try:
+                return header, await header.refresh_if_changed()
+            except (aiohttp.ClientError, TimeoutError, CircuitOpenError):
+                return None, False
         url = f"{self._base_url}:{port}"
+        # a short timeout keeps scans of closed ports fast, instances that were open get longer to answer under load
+        probe_timeout = self.request_policy.known_port_probe_timeout if header else self.request_policy.probe_timeout
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=0.2)) as response:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=probe_timeout)) as response:
                 if response.status == 200:
-                    await self.create_or_refresh_connection(port)
-                else:
-                    await self.close_if_open(port)
-        except (aiohttp.ClientError, asyncio.TimeoutError):
-            await self.close_if_open(port)
-
-    async def create_or_refresh_connection(self, port: Port) -> None:
-        if port not in self.open_port_headers.keys():
-            self.open_port_headers[port] = await ConnHeader.async_init(port)
-        else:
-            product_info = await self.open_port_headers[port].get_product_info()
-            archicad_id = await self.open_port_headers[port].get_archicad_id()
-            archicad_location = await self.open_port_headers[port].get_archicad_location()
-            if isinstance(self.open_port_headers[port].product_info, APIResponseError) or isinstance(
-                product_info, ProductInfo
-            ):
-                self.open_port_headers[port].product_info = product_info
-            if isinstance(self.open_port_headers[port].archicad_id, APIResponseError) or isinstance(
-                archicad_id, ArchiCadID
-            ):
-                self.open_port_headers[port].archicad_id = archicad_id
-            if isinstance(self.open_port_headers[port].archicad_location, APIResponseError) or isinstance(
-                archicad_location, ArchicadLocation
-            ):
-                self.open_port_headers[port].archicad_location = archicad_location
+                    return await self.create_or_refresh_connection(port)
+        except (aiohttp.ClientError, TimeoutError):
+            pass
+        except CircuitOpenError:
+            # the instance answers the probe, but its requests fail fast until the circuit closes, so its header is
+            # kept as it is
+            return header, False
+        return None, False
+
+    async def create_or_refresh_connection(self, port: Port) -> tuple[ConnHeader, bool]:
+        header = self._open_port_headers.get(port)
+        if header is None:
+            return (
+                await ConnHeader.async_init(port, self.pool_limits, self.request_policy, self.hooks, self.cache_policy),
+                False,
+            )
+        return header, await header.refresh()
+
+    # The results of a scan are applied at once, so open_port_headers is never seen half refreshed
+    async def _apply_scan_results(self, results: dict[Port, tuple[ConnHeader | None, bool]]) -> ScanDiff:
+        open_port_headers = dict(self._open_port_headers)
+        closed_headers = []
+        diff = ScanDiff()
+        for port, (header, changed) in results.items():
+            if header is None:
+                if port in open_port_headers:
+                    closed_headers.append(open_port_headers.pop(port))
+                    diff.closed.append(port)
+            elif port not in open_port_headers:
+                open_port_headers[port] = header
+                diff.opened.append(port)
+            elif header is not open_port_headers[port]:
+                # a concurrent scan has already added a header for this instance
+                closed_headers.append(header)
+            elif changed:
+                diff.changed.append(port)
+        self.open_port_headers = dict(sorted(open_port_headers.items()))
+        if diff and log.isEnabledFor(logging.DEBUG):
+            for event, ports in (("opened", diff.opened), ("closed", diff.closed), ("changed", diff.changed)):
+                for port in ports:
+                    log.debug("Port %s %s", port, event, extra={"port": port, "event": event})
+        await asyncio.gather(*(cast(Awaitable[None], header.close()) for header in closed_headers))
+        if self._primary and self._primary.port in diff.closed:
+            await cast(Awaitable[None], self._set_primary())
+        return diff
 
     async def close_if_open(self, port: Port) -> None:
-        if port in self.open_port_headers.keys():
-            self.open_port_headers.pop(port)
+        if port in self._open_port_headers:
+            header = self._open_port_headers.pop(port)
+            await cast(Awaitable[None], header.close())
             if self._primary and self._primary.port == port:
                 await cast(Awaitable[None], self._set_primary())
 
@@ -135,31 +329,40 @@ class MultiConn:
             await self._set_primary_from_none()
 
     async def _set_primary_from_port(self, port: Port) -> None:
-        if port in self.open_port_headers.keys():
+        if self.lazy and self._first_scan_pending and port not in self._open_port_headers:
+            # only the chosen port is scanned, the rest of the range is scanned on the first access
+            await self.scan_ports([port])
+        if port in self._open_port_headers:
             await self._set_primary_namespaces(port)
         else:
             raise KeyError(f"Failed to set primary. Port {port} is closed.")
 
     async def _set_primary_from_header(self, header: ConnHeader) -> None:
-        if header in self.open_port_headers.values() and header.port:
+        if header in self._open_port_headers.values() and header.port:
             await self._set_primary_namespaces(header.port)
         else:
             raise KeyError(f"Failed to set primary. There is no open port with header: {header}")
 
     async def _set_primary_from_none(self) -> None:
         for port in self._port_range:
-            if port in self.open_port_headers.keys():
+            if port in self._open_port_headers:
                 await self._set_primary_namespaces(port)
                 return
         await self._clear_primary_namespaces()
 
+    # The primary is the header of the port in open_port_headers, so it shares its connection pool and status. Its
+    # namespaces are connected without changing its status, which is left to the connect actions.
     async def _set_primary_namespaces(self, port: Port) -> None:
-        self._primary = await ConnHeader.async_init(port)
-        self._primary.connect()
+        self._primary = self._open_port_headers[port]
+        if isinstance(product_info := self._primary.product_info, ProductInfo):
+            self._primary.standard.connect(product_info)
+            self._primary.async_standard.connect(product_info)
         self.core = self._primary.core
         self.standard = self._primary.standard
+        self.async_standard = self._primary.async_standard
 
     async def _clear_primary_namespaces(self) -> None:
         self._primary = None
         self.core = CoreCommands
         self.standard = StandardConnection
+        self.async_standard = AsyncStandardConnection
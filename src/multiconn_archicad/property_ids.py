@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+from collections.abc import Awaitable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+from multiconn_archicad.basic_types import APIResponseError, ProductInfo
+from multiconn_archicad.core_commands import TRANSPORT_ERROR_CODE
+from multiconn_archicad.errors import CommandFailedError, NotFullyInitializedError
+from multiconn_archicad.utilities.async_utils import callable_from_sync_or_async_context
+
+if TYPE_CHECKING:
+    from multiconn_archicad.conn_header import ConnHeader
+
+_Release = tuple[int, int]
+
+
+class PropertyIdResolver:
+    """Resolves the non-localized names of built-in properties (e.g. "General_ElementID") to their guids.
+
+    The guids of built-in properties are the same in every project of an Archicad version and build, so each name is
+    requested from only one instance per version and build, and is then shared by all of them. With a path, the
+    resolved guids are also saved to, and loaded from a JSON file, so later runs do not request them at all.
+    """
+
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        self.path: Path | None = Path(path) if path is not None else None
+        self._guids: dict[_Release, dict[str, str]] = {}
+        # names being requested, so concurrent lookups of other instances wait for them instead of requesting them
+        self._pending: dict[tuple[_Release, str], concurrent.futures.Future[str]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self._load(self.path)
+
+    def __repr__(self) -> str:
+        releases = {f"{version}.{build}": len(guids) for (version, build), guids in self._guids.items()}
+        return f"{self.__class__.__name__}(path={self.path}, releases={releases})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def cached(self, product_info: ProductInfo) -> dict[str, str]:
+        with self._lock:
+            return dict(self._guids.get(self._release(product_info), {}))
+
+    # Returns the guid of each name, only the names not resolved yet for the version and build are requested. The
+    # names of a lookup that was cancelled are released, and the lookups waiting for them request them again.
+    @callable_from_sync_or_async_context
+    async def resolve(self, header: ConnHeader, *names: str) -> dict[str, str]:
+        product_info = getattr(header, "product_info", None)
+        if not isinstance(product_info, ProductInfo):
+            raise NotFullyInitializedError(f"The product info of the header on port {header.port} is not initialized")
+        release = self._release(product_info)
+        to_resolve = list(dict.fromkeys(names))
+        while to_resolve:
+            to_request, waiting = self._claim(release, to_resolve)
+            if to_request:
+                await self._request(header, release, to_request)
+            if waiting:
+                await asyncio.wait([asyncio.wrap_future(future) for future in waiting.values()])
+            to_resolve = [name for name, future in waiting.items() if future.cancelled()]
+            for future in waiting.values():
+                if not future.cancelled():
+                    future.result()
+        with self._lock:
+            return {name: self._guids[release][name] for name in names}
+
+    # Returns the names to request, and the futures of the names that are not resolved yet
+    def _claim(
+        self, release: _Release, names: list[str]
+    ) -> tuple[list[str], dict[str, concurrent.futures.Future[str]]]:
+        to_request: list[str] = []
+        waiting: dict[str, concurrent.futures.Future[str]] = {}
+        with self._lock:
+            guids = self._guids.setdefault(release, {})
+            for name in names:
+                if name in guids:
+                    continue
+                future = self._pending.get((release, name))
+                if future is None:
+                    future = concurrent.futures.Future()
+                    self._pending[(release, name)] = future
+                    to_request.append(name)
+                waiting[name] = future
+        return to_request, waiting
+
+    async def _request(self, header: ConnHeader, release: _Release, names: list[str]) -> None:
+        futures = {name: self._pending[(release, name)] for name in names}
+        try:
+            result = await cast(
+                Awaitable[dict[str, Any]],
+                header.core.post_command(
+                    "API.GetPropertyIds",
+                    {"properties": [{"type": "BuiltIn", "nonLocalizedName": name} for name in names]},
+                ),
+            )
+            if not result.get("succeeded"):
+                error = APIResponseError.from_api_response(result)
+                raise CommandFailedError(error.code, error.message)
+            items = result["result"]["properties"]
+        except asyncio.CancelledError:
+            with self._lock:
+                for name, future in futures.items():
+                    del self._pending[(release, name)]
+                    future.cancel()
+            raise
+        except Exception as e:
+            with self._lock:
+                for name, future in futures.items():
+                    del self._pending[(release, name)]
+                    future.set_exception(e)
+            raise
+        resolved: dict[str, str] = {}
+        with self._lock:
+            for index, (name, future) in enumerate(futures.items()):
+                del self._pending[(release, name)]
+                item = items[index] if index < len(items) else {}
+                if "propertyId" in item:
+                    resolved[name] = item["propertyId"]["guid"]
+                    future.set_result(resolved[name])
+                elif "error" in item:
+                    error = APIResponseError.from_api_response(item)
+                    future.set_exception(CommandFailedError(error.code, f"{name}: {error.message}"))
+                else:
+                    future.set_exception(
+                        CommandFailedError(TRANSPORT_ERROR_CODE, f"{name}: The response has no property id for it")
+                    )
+            self._guids[release].update(resolved)
+        if resolved and self.path is not None:
+            await asyncio.to_thread(self._save, self.path)
+
+    @staticmethod
+    def _release(product_info: ProductInfo) -> _Release:
+        return product_info.version, product_info.build
+
+    def _load(self, path: Path) -> None:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for release, guids in data.items():
+            version, build = release.split(".")
+            self._guids[(int(version), int(build))] = dict(guids)
+
+    # The file is replaced at once, so an interrupted save does not leave a broken file behind
+    def _save(self, path: Path) -> None:
+        with self._lock:
+            data = {f"{version}.{build}": dict(guids) for (version, build), guids in sorted(self._guids.items())}
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(temporary, path)
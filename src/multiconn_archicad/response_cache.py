@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Which responses of a port are cached, and for how long. Only successful responses of the commands in
+    cacheable_commands are cached (Tapir commands by name, official commands with the "API." prefix). Any other
+    command, except the ones that only read the project, clears the cache of the port."""
+
+    ttl: float = 60.0
+    max_entries: int = 256
+    cacheable_commands: frozenset[str] = frozenset(
+        {
+            "API.GetProductInfo",
+            "GetProjectInfo",
+            "GetArchicadLocation",
+            "GetAddOnVersion",
+            "API.GetPropertyIds",
+            "API.GetAllPropertyNames",
+            "API.GetAllClassificationSystems",
+            "API.GetAllClassificationsInSystem",
+        }
+    )
+    # commands that do not modify the project, besides the Get... commands and IsAlive
+    read_only_commands: frozenset[str] = frozenset()
+
+    def is_cacheable(self, command: str) -> bool:
+        return command in self.cacheable_commands
+
+    def invalidates(self, command: str) -> bool:
+        if command in self.cacheable_commands or command in self.read_only_commands:
+            return False
+        return not command.removeprefix("API.").startswith(("Get", "IsAlive"))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+@dataclass
+class _Entry:
+    expires: float
+    response: bytes = field(repr=False)
+
+
+class ResponseCache:
+    """Serialized responses of one port by command and parameters, evicted after the ttl of the policy, or when the
+    cache is full, starting with the least recently used one.
+
+    The responses are kept serialized, so every hit returns a new object that the caller can modify.
+    """
+
+    def __init__(self, policy: CachePolicy | None = None) -> None:
+        self.policy: CachePolicy = policy if policy is not None else CachePolicy()
+        self.stats: CacheStats = CacheStats()
+        self._entries: OrderedDict[tuple[str, str | bytes], _Entry] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(policy={self.policy!r}, entries={len(self)}, stats={self.stats!r})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Parameters given as a dict are canonicalized, so the order of their keys does not matter. Already serialized
+    # requests are used as they are.
+    @staticmethod
+    def key(command: str, parameters: dict[str, Any] | bytes | None) -> tuple[str, str | bytes]:
+        if isinstance(parameters, bytes):
+            return command, parameters
+        return command, json.dumps(parameters or {}, sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: tuple[str, str | bytes]) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.response
+
+    def put(self, key: tuple[str, str | bytes], response: bytes) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(time.monotonic() + self.policy.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.policy.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self.stats.invalidations += 1
+            self._entries.clear()
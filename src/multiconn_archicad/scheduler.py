@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Requests with a lower value are sent first. Health probes and interactive calls should not wait for bulk
+    jobs."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}.{self.name}"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
+@dataclass
+class SchedulerMetrics:
+    """Totals since the scheduler was created. Wait times are in seconds."""
+
+    requests: int = 0
+    queued: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    max_queue_depth: int = 0
+    requests_by_priority: dict[Priority, int] = field(default_factory=lambda: {priority: 0 for priority in Priority})
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class RequestScheduler:
+    """Limits the requests in flight to a single Archicad instance, and lets the waiting requests in by priority,
+    then in order of arrival.
+
+    Archicad handles the requests of an instance one at a time, so requests over the limit would only queue up
+    inside Archicad, where they can not be reordered and count against their timeouts. The scheduler can be used
+    from several event loops at once.
+    """
+
+    def __init__(self, max_in_flight: int = 2) -> None:
+        self.max_in_flight: int = max_in_flight
+        self.metrics: SchedulerMetrics = SchedulerMetrics()
+        self._in_flight: int = 0
+        self._waiters: list[tuple[Priority, int, asyncio.Future[None], asyncio.AbstractEventLoop]] = []
+        self._order = itertools.count()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(max_in_flight={self.max_in_flight}, in_flight={self.in_flight}, "
+            f"queue_depth={self.queue_depth})"
+        )
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority = Priority.NORMAL) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: Priority = Priority.NORMAL) -> None:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._record(priority, 0.0, queued=False)
+                return
+            future: asyncio.Future[None] = loop.create_future()
+            waiter = (priority, next(self._order), future, loop)
+            heapq.heappush(self._waiters, waiter)
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, len(self._waiters))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                    granted = False
+                else:
+                    # if the slot was handed over, but not yet granted, _grant gives it back
+                    granted = future.done() and not future.cancelled()
+            if granted:
+                self.release()
+            raise
+        with self._lock:
+            self._record(priority, time.perf_counter() - start, queued=True)
+
+    # The slot is handed over to the next waiter directly, so a new request can not overtake the queue
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                _, _, future, loop = heapq.heappop(self._waiters)
+                if loop.is_closed():
+                    continue
+                loop.call_soon_threadsafe(self._grant, future)
+                return
+            self._in_flight -= 1
+
+    def _grant(self, future: asyncio.Future[None]) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def _record(self, priority: Priority, wait: float, queued: bool) -> None:
+        metrics = self.metrics
+        metrics.requests += 1
+        metrics.queued += queued
+        metrics.total_wait += wait
+        metrics.max_wait = max(metrics.max_wait, wait)
+        metrics.requests_by_priority[priority] += 1
@@ -1,21 +1,34 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
 
-from archicad.versioning import _Versioning
+import functools
+import importlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
 from archicad.connection import create_request
 from archicad.releases import Commands, Types, Utilities
+from archicad.versioning import _Versioning
+
+from multiconn_archicad.hooks import RequestHooks, RequestInfo
+from multiconn_archicad.response_cache import ResponseCache
 
 if TYPE_CHECKING:
-    from multiconn_archicad.basic_types import ProductInfo, Port
     from urllib.request import Request
 
+    from multiconn_archicad.basic_types import Port, ProductInfo
+
 
 class StandardConnection:
     types = Types
     commands = Commands
     utilities = Utilities
 
-    def __init__(self, port: Port):
+    def __init__(self, port: Port, hooks: RequestHooks | None = None, cache: ResponseCache | None = None):
+        self.port: Port = port
+        self.hooks: RequestHooks = hooks if hooks is not None else RequestHooks()
+        # the response cache of the core namespace of the port, cleared by the commands that modify the project
+        self.cache: ResponseCache | None = cache
         self._request: Request = create_request(int(port))
 
     def __repr__(self) -> str:
@@ -25,12 +38,79 @@ class StandardConnection:
         return f"{self.__class__.__name__}(_request={self._request.full_url})"
 
     def connect(self, product_info: ProductInfo) -> None:
-        v = _Versioning(product_info.version, product_info.build, self._request)
-        self.commands = v.commands
-        self.types = v.types
-        self.utilities = v.utilities
+        release = load_release(product_info.version, product_info.build)
+        self.types = release.types
+        self.commands = _HookedCommands(release.commands(self._request), self.hooks, self.port, self.cache)
+        self.utilities = release.utilities(self.types, self.commands)
 
     def disconnect(self) -> None:
         self.types = Types
         self.commands = Commands
         self.utilities = Utilities
+
+
+class _HookedCommands:
+    """Calls the hooks around the commands of the official wrapper, and clears the response cache after the
+    commands that modify the project. Commands with nothing to do are returned as they are."""
+
+    def __init__(self, commands: Any, hooks: RequestHooks, port: Port, cache: ResponseCache | None = None) -> None:
+        self._commands: Any = commands
+        self._hooks: RequestHooks = hooks
+        self._port: Port = port
+        self._cache: ResponseCache | None = cache
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._commands!r}, hooks={self._hooks!r})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._commands, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        command = f"API.{name}"
+        invalidates = self._cache is not None and self._cache.policy.invalidates(command)
+        if not self._hooks and not invalidates:
+            return attribute
+        return functools.partial(self._call, command, attribute, invalidates)
+
+    def _call(self, command: str, method: Callable[..., Any], invalidates: bool, *args: Any, **kwargs: Any) -> Any:
+        info = RequestInfo(command=command, port=self._port, request_bytes=None)
+        self._hooks.call_before_sync(info)
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            info.finish()
+            self._hooks.call_error_sync(info, e)
+            raise
+        finally:
+            if invalidates and self._cache is not None:
+                self._cache.clear()
+        info.finish()
+        self._hooks.call_after_sync(info, result)
+        return result
+
+
+@dataclass(frozen=True)
+class Release:
+    release: int
+    build: int
+    types: Any
+    commands: type
+    utilities: type
+
+
+# Finding and importing the modules of a release is done once per version and build in the process, connecting
+# only creates the Commands and Utilities objects bound to the request of the instance
+@functools.cache
+def load_release(version: int, build: int) -> Release:
+    release, build = _Versioning.discover(version, build)
+    prefix = f"archicad.releases.ac{release}.b{build}"
+    return Release(
+        release=release,
+        build=build,
+        types=importlib.import_module(f"{prefix}types").Types(),
+        commands=importlib.import_module(f"{prefix}commands").Commands,
+        utilities=importlib.import_module(f"{prefix}utilities").Utilities,
+    )
@@ -0,0 +1,6 @@
+from .mock_server import MockArchicad, MockArchicadServer
+
+__all__: tuple[str, ...] = (
+    "MockArchicad",
+    "MockArchicadServer",
+)
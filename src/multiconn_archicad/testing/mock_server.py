@@ -0,0 +1,232 @@
+"""A local stand-in for Archicad's JSON API, for tests and benchmarks without running Archicad.
+
+Run from the command line:
+
+    python -m multiconn_archicad.testing --ports 19723 19724 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Self
+
+from aiohttp import web
+
+from multiconn_archicad.basic_types import Port
+
+
+@dataclass
+class MockArchicad:
+    """A single simulated Archicad instance with the Tapir add-on installed."""
+
+    port: Port
+    version: int = 27
+    build: int = 3001
+    lang: str = "INT"
+    project_name: str = "MockProject"
+    project_path: str = "C:\\Projects\\MockProject.pln"
+    is_untitled: bool = False
+    archicad_location: str = "C:\\Program Files\\Graphisoft\\Archicad 27\\Archicad.exe"
+    # seconds added to every command, plus a random amount up to jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # fraction of commands answered with an error
+    error_rate: float = 0.0
+    # number of elements returned by GetAllElements, this sets the size of most element payloads
+    element_count: int = 100
+    # Archicad handles the requests of an instance one at a time
+    serial: bool = True
+    seed: int | None = None
+    requests: Counter[str] = field(default_factory=Counter)
+
+    def __post_init__(self) -> None:
+        self.port = Port(self.port)
+        self._random: random.Random = random.Random(self.seed)
+        self._lock: asyncio.Lock | None = None
+        self._official_commands: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+            "API.IsAlive": lambda _: {"isAlive": True},
+            "API.GetProductInfo": lambda _: {
+                "version": self.version,
+                "buildNumber": self.build,
+                "languageCode": self.lang,
+            },
+            "API.GetAllElements": lambda _: {"elements": self.elements()},
+            "API.GetPropertyIds": self.get_property_ids,
+            "API.SetPropertyValuesOfElements": self.set_property_values_of_elements,
+        }
+        self._tapir_commands: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+            "GetAddOnVersion": lambda _: {"version": "1.0.0"},
+            "GetProjectInfo": lambda _: self.project_info(),
+            "GetArchicadLocation": lambda _: {"archicadLocation": self.archicad_location},
+            "GetAllElements": lambda _: {"elements": self.elements()},
+            "GetPropertyValuesOfElements": self.get_property_values_of_elements,
+            "SetPropertyValuesOfElements": self.set_property_values_of_elements,
+            "QuitArchicad": lambda _: {},
+        }
+
+    def project_info(self) -> dict[str, Any]:
+        return {
+            "isUntitled": self.is_untitled,
+            "isTeamwork": False,
+            "projectPath": self.project_path,
+            "projectName": self.project_name,
+        }
+
+    def elements(self) -> list[dict[str, Any]]:
+        return [{"elementId": {"guid": str(uuid.UUID(int=self.port * 10**9 + i))}} for i in range(self.element_count)]
+
+    @staticmethod
+    def get_property_ids(parameters: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "properties": [
+                {"propertyId": {"guid": str(uuid.uuid5(uuid.NAMESPACE_OID, str(property_user_id)))}}
+                for property_user_id in parameters.get("properties", [])
+            ]
+        }
+
+    @staticmethod
+    def get_property_values_of_elements(parameters: dict[str, Any]) -> dict[str, Any]:
+        properties = parameters.get("properties", [])
+        return {
+            "propertyValuesForElements": [
+                {"propertyValues": [{"propertyValue": {"value": f"{i}"}} for i, _ in enumerate(properties)]}
+                for _ in parameters.get("elements", [])
+            ]
+        }
+
+    @staticmethod
+    def set_property_values_of_elements(parameters: dict[str, Any]) -> dict[str, Any]:
+        return {"executionResults": [{"success": True} for _ in parameters.get("elementPropertyValues", [])]}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if request.method == "GET":
+            return web.Response(text="Mock Archicad")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self.serial:
+            async with self._lock:
+                return await self._respond(request)
+        return await self._respond(request)
+
+    async def _respond(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        command: str = body.get("command", "")
+        parameters: dict[str, Any] = body.get("parameters") or {}
+        is_tapir_command = command == "API.ExecuteAddOnCommand"
+        handler: Callable[[dict[str, Any]], dict[str, Any]] | None
+        if is_tapir_command:
+            command = parameters.get("addOnCommandId", {}).get("commandName", "")
+            parameters = parameters.get("addOnCommandParameters") or {}
+            handler = self._tapir_commands.get(command, lambda _: {"success": True})
+        else:
+            handler = self._official_commands.get(command)
+        self.requests[command] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if handler is None:
+            return web.json_response(self.error(2, f"Unknown command: {command}"))
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.json_response(self.error(1, f"Injected error for {command}"))
+        result = handler(parameters)
+        return web.json_response(
+            {"succeeded": True, "result": {"addOnCommandResponse": result} if is_tapir_command else result}
+        )
+
+    @staticmethod
+    def error(code: int, message: str) -> dict[str, Any]:
+        return {"succeeded": False, "error": {"code": code, "message": message}}
+
+
+class MockArchicadServer:
+    """Serves MockArchicad instances, either on the running event loop (async with), or on a background thread
+    (with)."""
+
+    def __init__(self, instances: list[MockArchicad] | None = None, ports: list[int] | None = None, **kwargs: Any):
+        self.instances: dict[Port, MockArchicad] = {instance.port: instance for instance in instances or []}
+        for port in ports or []:
+            self.instances[Port(port)] = MockArchicad(Port(port), **kwargs)
+        self._runners: list[web.AppRunner] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(ports={list(self.instances.keys())})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def __getitem__(self, port: int) -> MockArchicad:
+        return self.instances[Port(port)]
+
+    async def start(self) -> None:
+        for port, instance in self.instances.items():
+            app = web.Application(client_max_size=1024**3)
+            app.router.add_route("*", "/", instance.handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            self._runners.append(runner)
+
+    async def stop(self) -> None:
+        runners, self._runners = self._runners, []
+        await asyncio.gather(*(runner.cleanup() for runner in runners))
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.stop()
+
+    def start_in_background(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="Mock Archicad", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+
+    def stop_in_background(self) -> None:
+        if self._loop and self._thread:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop, self._thread = None, None
+
+    def __enter__(self) -> Self:
+        self.start_in_background()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop_in_background()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", type=int, nargs="+", default=[19723])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--element-count", type=int, default=100)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        async with MockArchicadServer(
+            ports=args.ports,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            element_count=args.element_count,
+        ):
+            print(f"Mock Archicad listening on ports: {', '.join(map(str, args.ports))}")
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,76 @@
 import asyncio
+import atexit
+import contextlib
 import functools
-from asyncio import Task
-from typing import Callable, Coroutine, Any
+import inspect
 import threading
+import weakref
+from asyncio import Task
+from typing import Callable, Coroutine, Any, Awaitable, Protocol
+
+
+class SupportsClose(Protocol):
+    def close(self) -> Awaitable[None] | None: ...
+
+
+# A single long-lived event loop runs on a daemon thread, and every sync caller is served by it. Objects that keep
+# state bound to this loop (e.g. pooled aiohttp sessions) survive between calls, and are closed at exit.
+_loop: asyncio.AbstractEventLoop | None = None
+_thr: threading.Thread | None = None
+_lock: threading.Lock = threading.Lock()
+_close_on_shutdown: weakref.WeakSet[SupportsClose] = weakref.WeakSet()
+
+
+def get_runtime_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thr
+    with _lock:
+        if _loop is None or _thr is None or not _thr.is_alive():
+            _loop = asyncio.new_event_loop()
+            _thr = threading.Thread(target=_loop.run_forever, name="Async Runner", daemon=True)
+            _thr.start()
+        return _loop
+
 
-_loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+def is_runtime_thread() -> bool:
+    return _thr is not None and threading.current_thread() is _thr
 
-_thr: threading.Thread = threading.Thread(target=_loop.run_forever, name="Async Runner", daemon=True)
+
+def close_on_shutdown(closeable: SupportsClose) -> None:
+    _close_on_shutdown.add(closeable)
+
+
+def shutdown_runtime(timeout: float = 5.0) -> None:
+    global _loop, _thr
+    with _lock:
+        loop, thread = _loop, _thr
+        _loop, _thr = None, None
+
+    async def close_all() -> None:
+        results = [closeable.close() for closeable in list(_close_on_shutdown)]
+        await asyncio.gather(*(result for result in results if inspect.isawaitable(result)), return_exceptions=True)
+
+    if loop is None or thread is None or not thread.is_alive():
+        # objects may still hold state of loops that were run by the user
+        asyncio.run(close_all())
+        return
+    with contextlib.suppress(TimeoutError):
+        asyncio.run_coroutine_threadsafe(close_all(), loop).result(timeout)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    if not thread.is_alive():
+        loop.close()
+
+
+atexit.register(shutdown_runtime)
 
 
 # This will block the calling thread until the coroutine is finished.
 # Any exception that occurs in the coroutine is raised in the caller
 def run_async[T](coroutine: Coroutine[Any, Any, T]) -> T:
-    if not _thr.is_alive():
-        _thr.start()
-    future = asyncio.run_coroutine_threadsafe(coroutine, _loop)
+    if is_runtime_thread():
+        coroutine.close()
+        raise RuntimeError("Blocking call from the async runner thread would deadlock, await the coroutine instead.")
+    future = asyncio.run_coroutine_threadsafe(coroutine, get_runtime_loop())
     return future.result()
 
 
@@ -27,16 +83,24 @@ def callable_from_sync_or_async_context[T, **P](
             asyncio.get_running_loop().is_running()
             return asyncio.create_task(function(*args, **kwargs))
         except RuntimeError:
-            return asyncio.run(function(*args, **kwargs))
+            return run_async(function(*args, **kwargs))
 
     return wrapper
 
 
+# Unlike callable_from_sync_or_async_context, this always blocks until the result is ready, even in async context
 def run_in_sync_or_async_context[T, **P](
     function: Callable[P, Coroutine[Any, Any, T]], *args: P.args, **kwargs: P.kwargs
 ) -> T:
-    try:
-        asyncio.get_running_loop().is_running()
-        return run_async(function(*args, **kwargs))
-    except RuntimeError as _:
-        return asyncio.run(function(*args, **kwargs))
+    return run_async(function(*args, **kwargs))
+
+
+# Awaits the coroutine on the loop that owns it, e.g. to close a session created by another loop.
+# Coroutines of loops that are no longer running are discarded.
+async def run_on_loop[T](coroutine: Coroutine[Any, Any, T], loop: asyncio.AbstractEventLoop) -> T | None:
+    if loop is asyncio.get_running_loop():
+        return await coroutine
+    if loop.is_closed() or not loop.is_running():
+        coroutine.close()
+        return None
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
@@ -0,0 +1,127 @@
+import codecs
+import json
+import re
+from collections.abc import Sequence
+from typing import Any
+
+# A whole string, or a structural character. A lone quote is the start of a string that is not complete yet.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|["\[\]{},]', re.DOTALL)
+_SEPARATOR = re.compile(r"[\s,]*")
+_ITEM_END = frozenset(",] \t\r\n")
+
+
+class _Frame:
+    __slots__ = ("expect_key", "is_object", "key")
+
+    def __init__(self, is_object: bool) -> None:
+        self.is_object: bool = is_object
+        self.key: str | None = None
+        self.expect_key: bool = is_object
+
+
+class JsonArrayStream:
+    """Decodes the items of one array of a JSON document that is fed in chunks.
+
+    The array is found by the keys of the objects leading to it, e.g. ("result", "elements"). feed() returns the items
+    completed by the chunk, so only the current item and chunk are held in memory. close() returns the rest of the
+    document, with the array left empty.
+    """
+
+    def __init__(self, path: Sequence[str]) -> None:
+        self.path: tuple[str, ...] = tuple(path)
+        self.found: bool = False
+        self._decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder: json.JSONDecoder = json.JSONDecoder()
+        self._buffer: str = ""
+        self._pos: int = 0
+        self._frames: list[_Frame] = []
+        self._in_array: bool = False
+        self._skeleton: list[str] = []
+        self._skeleton_from: int = 0
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(chunk)
+        self._pos = 0
+        items: list[Any] = []
+        while self._scan_array(items) if self._in_array else self._scan_document():
+            pass
+        self._trim()
+        return items
+
+    def close(self) -> Any:
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(b"", final=True)
+        self._pos = 0
+        if self._in_array or self._frames or self._buffer.strip():
+            raise ValueError("JSON document ended unexpectedly")
+        self._trim()
+        return json.loads("".join(self._skeleton))
+
+    # Follows the structure of the document outside the array, returns False when it needs more data
+    def _scan_document(self) -> bool:
+        buffer, frames = self._buffer, self._frames
+        while True:
+            match = _TOKEN.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                return False
+            start, end = match.span()
+            char = buffer[start]
+            if char == '"':
+                if end - start == 1:
+                    # the string continues in the next chunk
+                    self._pos = start
+                    return False
+                if frames and frames[-1].expect_key:
+                    frames[-1].key = buffer[start + 1 : end - 1]
+                    frames[-1].expect_key = False
+            elif char == "{":
+                frames.append(_Frame(is_object=True))
+            elif char == "[":
+                if not self.found and self._is_at_path():
+                    self.found = True
+                    self._in_array = True
+                    self._skeleton.append(buffer[self._skeleton_from : end])
+                    self._pos = end
+                    return True
+                frames.append(_Frame(is_object=False))
+            elif char == "}" or char == "]":
+                if not frames:
+                    raise ValueError(f"Unexpected {char!r} in JSON document")
+                frames.pop()
+            elif frames and frames[-1].is_object:
+                frames[-1].expect_key = True
+            self._pos = end
+
+    # Decodes the items of the array with the C decoder of the json module, returns False when it needs more data
+    def _scan_array(self, items: list[Any]) -> bool:
+        buffer = self._buffer
+        while True:
+            pos = _SEPARATOR.match(buffer, self._pos).end()  # type: ignore[union-attr]
+            self._pos = pos
+            if pos == len(buffer):
+                return False
+            if buffer[pos] == "]":
+                self._in_array = False
+                self._skeleton_from = pos
+                self._pos = pos + 1
+                return True
+            try:
+                item, end = self._json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                return False
+            if end == len(buffer) or buffer[end] not in _ITEM_END:
+                # a number may continue in the next chunk
+                return False
+            items.append(item)
+            self._pos = end
+
+    def _is_at_path(self) -> bool:
+        return len(self._frames) == len(self.path) and all(
+            frame.is_object and frame.key == key for frame, key in zip(self._frames, self.path)
+        )
+
+    # Moves the consumed part of the buffer outside the array to the skeleton
+    def _trim(self) -> None:
+        if not self._in_array:
+            self._skeleton.append(self._buffer[self._skeleton_from : self._pos])
+            self._skeleton_from = 0
@@ -0,0 +1,113 @@
+import json
+from collections.abc import Callable
+from typing import Any, Protocol
+
+
+class Serializer(Protocol):
+    name: str
+
+    def encode(self, obj: Any) -> bytes: ...
+
+    def decode(self, data: bytes) -> Any: ...
+
+
+class _SerializerBase:
+    name: str
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
+class StdlibSerializer(_SerializerBase):
+    name: str = "json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(_SerializerBase):
+    name: str = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps: Callable[[Any], bytes] = orjson.dumps
+        self._loads: Callable[[bytes], Any] = orjson.loads
+
+    def encode(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def decode(self, data: bytes) -> Any:
+        # orjson.JSONDecodeError is a ValueError
+        return self._loads(data)
+
+
+class MsgspecSerializer(_SerializerBase):
+    name: str = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._decode_error: type[Exception] = msgspec.DecodeError
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def decode(self, data: bytes) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._decode_error as e:
+            # raised as ValueError, like the decode errors of the other serializers
+            raise ValueError(str(e)) from e
+
+
+# In order of preference, the first one that can be imported is the default
+SERIALIZERS: dict[str, Callable[[], Serializer]] = {
+    OrjsonSerializer.name: OrjsonSerializer,
+    MsgspecSerializer.name: MsgspecSerializer,
+    StdlibSerializer.name: StdlibSerializer,
+}
+
+_default: Serializer | None = None
+
+
+def get_serializer(name: str | None = None) -> Serializer:
+    global _default
+    if name is not None:
+        if name not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer: {name}. Available: {', '.join(SERIALIZERS.keys())}")
+        return SERIALIZERS[name]()
+    if _default is None:
+        for serializer_type in SERIALIZERS.values():
+            try:
+                _default = serializer_type()
+                break
+            except ImportError:
+                continue
+    assert _default is not None
+    return _default
+
+
+# Sets the serializer used by the CoreCommands created from now on
+def set_default_serializer(serializer: Serializer | str) -> None:
+    global _default
+    _default = get_serializer(serializer) if isinstance(serializer, str) else serializer
+
+
+def available_serializers() -> list[str]:
+    available = []
+    for name, serializer_type in SERIALIZERS.items():
+        try:
+            serializer_type()
+            available.append(name)
+        except ImportError:
+            continue
+    return available
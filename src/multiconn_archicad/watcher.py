@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from multiconn_archicad.utilities.async_utils import get_runtime_loop
+
+if TYPE_CHECKING:
+    from multiconn_archicad.basic_types import Port, ScanDiff
+    from multiconn_archicad.conn_header import ConnHeader
+    from multiconn_archicad.multi_conn import MultiConn
+
+log = logging.getLogger(__name__)
+
+
+class PortEventType(Enum):
+    OPENED = "opened"
+    CLOSED = "closed"
+    CHANGED = "changed"
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}.{self.name}"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
+@dataclass
+class PortEvent:
+    type: PortEventType
+    port: Port
+    header: ConnHeader | None
+
+
+type PortEventCallback = Callable[[PortEvent], Awaitable[None] | None]
+
+
+class InstanceWatcher:
+    """Keeps the open ports of a MultiConn up to date in the background.
+
+    The ports are scanned incrementally. After a change the next scan comes after min_interval, and while nothing
+    changes the interval grows by backoff up to max_interval. Changes are published as PortEvents to the subscribed
+    callbacks (sync or async), and to every iterator returned by events().
+    """
+
+    def __init__(
+        self, multi_conn: MultiConn, min_interval: float = 0.5, max_interval: float = 10.0, backoff: float = 2.0
+    ) -> None:
+        self.multi_conn: MultiConn = multi_conn
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.backoff: float = backoff
+        self.interval: float = min_interval
+        self._callbacks: list[PortEventCallback] = []
+        self._queues: list[tuple[asyncio.Queue[PortEvent], asyncio.AbstractEventLoop]] = []
+        self._task: asyncio.Task[None] | concurrent.futures.Future[None] | None = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(running={self.running}, interval={self.interval})"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # In async context the watcher runs on the running loop, otherwise on the shared runtime loop
+    def start(self) -> None:
+        if self.running:
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        except RuntimeError:
+            self._task = asyncio.run_coroutine_threadsafe(self._watch(), get_runtime_loop())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def subscribe(self, callback: PortEventCallback) -> Callable[[], None]:
+        self._callbacks.append(callback)
+        return lambda: self._callbacks.remove(callback)
+
+    async def events(self) -> AsyncIterator[PortEvent]:
+        queue: asyncio.Queue[PortEvent] = asyncio.Queue()
+        subscription = (queue, asyncio.get_running_loop())
+        self._queues.append(subscription)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(subscription)
+
+    async def _watch(self) -> None:
+        self.interval = self.min_interval
+        while True:
+            try:
+                diff = await self.multi_conn.scan_ports(self.multi_conn.port_range, incremental=True)
+            except Exception as e:
+                log.warning("Watcher scan failed: %r", e, exc_info=e)
+            else:
+                if diff:
+                    self.interval = self.min_interval
+                    await self._publish(diff)
+                else:
+                    self.interval = min(self.interval * self.backoff, self.max_interval)
+            await asyncio.sleep(self.interval)
+
+    async def _publish(self, diff: ScanDiff) -> None:
+        headers = self.multi_conn.open_port_headers
+        events = (
+            [PortEvent(PortEventType.OPENED, port, headers.get(port)) for port in diff.opened]
+            + [PortEvent(PortEventType.CLOSED, port, None) for port in diff.closed]
+            + [PortEvent(PortEventType.CHANGED, port, headers.get(port)) for port in diff.changed]
+        )
+        for event in events:
+            for queue, loop in list(self._queues):
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            for callback in list(self._callbacks):
+                try:
+                    result = callback(event)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    log.warning("Watcher callback %r failed: %r", callback, e, exc_info=e, extra={"port": event.port})
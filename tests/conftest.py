@@ -0,0 +1,37 @@
+import pytest
+
+from multiconn_archicad import CoreCommands, Port
+from multiconn_archicad.testing import MockArchicadServer
+
+
+@pytest.fixture
+def ports() -> list[int]:
+    """The ports of the mock instances served for a test, override it in a module to serve others."""
+    return [19739]
+
+
+@pytest.fixture
+def mock_options() -> dict:
+    """The options of the mock instances (e.g. element_count), override it in a module to change them."""
+    return {}
+
+
+@pytest.fixture
+def server(ports, mock_options):
+    """Serve mock Archicad instances on the ports for a test."""
+    with MockArchicadServer(ports=ports, **mock_options) as server:
+        yield server
+
+
+@pytest.fixture
+def core_options() -> dict:
+    """The options of the CoreCommands of the core fixture (e.g. cache_policy), override it in a module to change them."""
+    return {}
+
+
+@pytest.fixture
+def core(server, ports, core_options):
+    """Create CoreCommands for the first mock instance, and close its pool after the test."""
+    core = CoreCommands(Port(ports[0]), **core_options)
+    yield core
+    core.close()
@@ -1,15 +1,12 @@
-from multiconn_archicad import StandardConnection, MultiConn, ConnHeader
-import asyncio
-from inspect import iscoroutinefunction
-from typing import Callable, Any
+from multiconn_archicad import ConnHeader, MultiConn, PropertyIdResolver
 
 
-def add_str_to_id(conn: StandardConnection, str_to_add: str) -> str:
+def add_str_to_id(conn_header: ConnHeader, property_ids: PropertyIdResolver, str_to_add: str) -> dict:
+    conn = conn_header.standard
     elements = conn.commands.GetAllElements()
-    property_user_id = [
-        conn.types.PropertyUserId(type="BuiltIn", nonLocalizedName="General_ElementID")
-    ]
-    property_id = conn.commands.GetPropertyIds(property_user_id)
+    # resolved once for all the instances of the same Archicad version and build
+    guids = property_ids.resolve(conn_header, "General_ElementID")
+    property_id = [conn.types.PropertyIdArrayItem(conn.types.PropertyId(guids["General_ElementID"]))]
     id_wrappers_of_elements = conn.commands.GetPropertyValuesOfElements(
         elements, property_id
     )
@@ -23,40 +20,20 @@ def add_str_to_id(conn: StandardConnection, str_to_add: str) -> str:
     element_property_values = [
         conn.types.ElementPropertyValue(
             element.elementId, property_id[0].propertyId, e_id
-        )
+        ).to_dict()
         for element, e_id in zip(elements, ids_of_elements)
     ]
-    return conn.commands.SetPropertyValuesOfElements(element_property_values)
-
-
-async def call_function(func, *args, **kwargs):
-    print(func)
-    if iscoroutinefunction(func):
-        return await func(*args, **kwargs)
-    else:
-        return await asyncio.to_thread(func, *args, **kwargs)
-
-
-async def run_function_on_all_active_async(
-    conn: MultiConn, fn: Callable[[ConnHeader, Any], Any], *args, **kwargs
-) -> dict:
-    for header in conn.open_port_headers.values():
-        print(header)
-    tasks = {
-        port: call_function(fn, conn_header, *args, **kwargs)
-        for port, conn_header in conn.active.items()
-    }
-    results = await asyncio.gather(*tasks.values())
-    return {port: result for port, result in zip(tasks.keys(), results)}
+    # sent in chunks, so large models do not stall Archicad with a single request
+    return conn_header.core.post_chunked(
+        "API.SetPropertyValuesOfElements", {"elementPropertyValues": element_property_values}
+    )
 
 
 def run_function_on_all_active():
     conn = MultiConn()
     conn.connect.all()
 
-
-    # Run the asyncio event loop
-    result = asyncio.run(run_function_on_all_active_async(conn, add_str_to_id, "?"))
+    result = conn.run_on.active(add_str_to_id, conn.property_ids, "?")
     print(result)
 
 
@@ -0,0 +1,107 @@
+import asyncio
+import inspect
+
+from archicad.releases import Commands
+
+from multiconn_archicad import ConnHeader, Port
+from multiconn_archicad.async_standard_connection import build_async_release
+
+
+def test_release_is_built_with_coroutine_commands():
+    release = build_async_release(27, 3001)
+    assert release is build_async_release(27, 3001)
+    assert inspect.iscoroutinefunction(release.commands.GetAllElements)
+    assert inspect.iscoroutinefunction(release.utilities.GetBuiltInPropertyId)
+    assert not inspect.iscoroutinefunction(release.utilities.__init__)
+
+
+def test_release_is_built_without_the_sources(monkeypatch):
+    def getsource(_):
+        raise OSError("could not get source code")
+
+    monkeypatch.setattr(inspect, "getsource", getsource)
+    build_async_release.cache_clear()
+    release = build_async_release(27, 3001)
+    assert inspect.iscoroutinefunction(release.commands.GetProductInfo)
+
+
+def test_results_match_the_standard_connection(server):
+    server[19739].element_count = 3
+
+    async def main():
+        header = await ConnHeader.async_init(Port(19739))
+        try:
+            header.connect()
+            commands, types = header.async_standard.commands, header.async_standard.types
+            user_ids = [types.PropertyUserId(type="BuiltIn", nonLocalizedName="General_ElementID")]
+            results = [
+                await commands.GetAllElements(),
+                await commands.GetProductInfo(),
+                await commands.GetPropertyIds(user_ids),
+                await commands.ExecuteAddOnCommand(types.AddOnCommandId("TapirCommand", "GetProjectInfo")),
+            ]
+            expected = await asyncio.to_thread(
+                lambda: [
+                    header.standard.commands.GetAllElements(),
+                    header.standard.commands.GetProductInfo(),
+                    header.standard.commands.GetPropertyIds(user_ids),
+                    header.standard.commands.ExecuteAddOnCommand(
+                        types.AddOnCommandId("TapirCommand", "GetProjectInfo")
+                    ),
+                ]
+            )
+            return results, expected
+        finally:
+            await header.core.close()
+
+    results, expected = asyncio.run(main())
+    assert repr(results) == repr(expected)
+
+
+def test_commands_are_sent_through_the_core(server):
+    server[19739].element_count = 5
+
+    async def main():
+        header = await ConnHeader.async_init(Port(19739))
+        try:
+            assert header.async_standard.commands is Commands
+            header.connect()
+            commands = header.async_standard.commands
+            elements = await commands.GetAllElements()
+            alive = await asyncio.gather(*(commands.IsAlive() for _ in range(3)))
+            property_id = await header.async_standard.utilities.GetBuiltInPropertyId("General_ElementID")
+            return header, elements, alive, property_id
+        finally:
+            await header.core.close()
+
+    header, elements, alive, property_id = asyncio.run(main())
+    assert len(elements) == 5
+    assert alive == [True, True, True]
+    assert property_id.guid
+    assert header.scheduler.metrics.requests >= 5
+
+
+def test_results_are_read_by_key(server, monkeypatch):
+    commands = server[19739]._official_commands
+    get_all_elements = commands["API.GetAllElements"]
+    monkeypatch.setitem(
+        commands,
+        "API.GetProductInfo",
+        lambda _: {"languageCode": "INT", "extra": 1, "buildNumber": 3001, "version": 27},
+    )
+    monkeypatch.setitem(commands, "API.GetAllElements", lambda parameters: {"count": 3} | get_all_elements(parameters))
+    server[19739].element_count = 3
+
+    async def main():
+        header = await ConnHeader.async_init(Port(19739))
+        try:
+            header.connect()
+            commands = header.async_standard.commands
+            return await commands.GetProductInfo(), await commands.GetAllElements()
+        finally:
+            await header.core.close()
+
+    product_info, elements = asyncio.run(main())
+    assert product_info == (27, 3001, "INT")
+    assert len(elements) == 3
+    assert elements[0].elementId.guid
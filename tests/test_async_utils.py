@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+from multiconn_archicad.utilities import async_utils
+from multiconn_archicad.utilities.async_utils import close_on_shutdown, get_runtime_loop, run_async, shutdown_runtime
+
+
+class Closeable:
+    """Records the thread it is closed on."""
+
+    def __init__(self) -> None:
+        self.closed_on: threading.Thread | None = None
+
+    async def close(self) -> None:
+        self.closed_on = threading.current_thread()
+
+
+def test_sync_callers_share_the_runtime_loop():
+    async def running_loop():
+        return asyncio.get_running_loop()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(run_async(running_loop()))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [get_runtime_loop()] * 3
+
+
+def test_shutdown_closes_tracked_objects_on_the_runtime_loop():
+    loop = get_runtime_loop()
+    closeable = Closeable()
+    close_on_shutdown(closeable)
+    shutdown_runtime()
+    assert closeable.closed_on is not None and closeable.closed_on.name == "Async Runner"
+    assert loop.is_closed()
+    assert get_runtime_loop() is not loop
+
+
+def test_shutdown_closes_tracked_objects_without_a_runtime_loop():
+    shutdown_runtime()
+    assert async_utils._loop is None
+    closeable = Closeable()
+    close_on_shutdown(closeable)
+    shutdown_runtime()
+    assert closeable.closed_on is threading.current_thread()
@@ -0,0 +1,318 @@
+import asyncio
+import json
+
+import pytest
+
+from multiconn_archicad import APIResponseError, ChunkedCommand, CoreCommands, Port
+from multiconn_archicad.circuit_breaker import CircuitState
+from multiconn_archicad.core_commands import TRANSPORT_ERROR_CODE, RequestPolicy
+from multiconn_archicad.errors import CircuitOpenError, CommandFailedError
+from multiconn_archicad.testing import MockArchicadServer
+from multiconn_archicad.utilities.json_stream import JsonArrayStream
+from multiconn_archicad.utilities.serialization import available_serializers, get_serializer
+
+
+@pytest.fixture(scope="module")
+def server():
+    """Serve a mock Archicad instance for the tests of this module."""
+    with MockArchicadServer(ports=[19740]) as server:
+        yield server
+
+
+@pytest.fixture
+def core(server):
+    """Create CoreCommands for the mock instance, and close its pool after the test."""
+    core = CoreCommands(Port(19740))
+    yield core
+    core.close()
+
+
+# Tests for single commands
+
+
+def test_post_command(core):
+    result = core.post_command("API.GetProductInfo")
+    assert result == {"succeeded": True, "result": {"version": 27, "buildNumber": 3001, "languageCode": "INT"}}
+
+
+def test_post_tapir_command(core, server):
+    result = core.post_tapir_command("GetProjectInfo")
+    assert result["succeeded"]
+    assert result["result"]["addOnCommandResponse"]["projectName"] == server[19740].project_name
+
+
+def test_post_tapir_command_with_parameters(core):
+    properties = [{"type": "BuiltIn", "nonLocalizedName": "General_ElementID"}]
+    result = core.post_tapir_command("GetPropertyValuesOfElements", {"elements": [{}, {}], "properties": properties})
+    assert len(result["result"]["addOnCommandResponse"]["propertyValuesForElements"]) == 2
+
+
+# Tests for the connection pool
+
+
+def test_session_is_reused_between_calls(core):
+    core.post_command("API.IsAlive")
+    sessions = list(core._sessions.values())
+    core.post_command("API.IsAlive")
+    assert list(core._sessions.values()) == sessions
+    assert len(sessions) == 1
+
+
+def test_close_releases_sessions(core):
+    core.post_command("API.IsAlive")
+    session = next(iter(core._sessions.values()))
+    core.close()
+    assert core._sessions == {}
+    assert session.closed
+
+
+def test_command_after_close_opens_new_session(core):
+    core.post_command("API.IsAlive")
+    core.close()
+    assert core.post_command("API.IsAlive")["succeeded"]
+
+
+def test_sessions_of_closed_loops_are_closed(core):
+    async def post():
+        await core.post_command("API.IsAlive")
+        return next(iter(core._sessions.values()))
+
+    first = asyncio.run(post())
+    # the loop of the first session was closed by asyncio.run, it is only closed when a new session is created
+    assert not first.closed
+    second = asyncio.run(post())
+    assert first.closed
+    assert list(core._sessions.values()) == [second]
+    core.close()
+    assert second.closed
+
+
+# Tests for batches
+
+
+def test_post_batch_keeps_order(core, server):
+    results = core.post_batch(
+        [("GetArchicadLocation", None), ("API.GetProductInfo", None), ("GetProjectInfo", None)], max_in_flight=2
+    )
+    assert results[0]["result"]["addOnCommandResponse"]["archicadLocation"] == server[19740].archicad_location
+    assert results[1]["result"]["version"] == 27
+    assert results[2]["result"]["addOnCommandResponse"]["projectName"] == server[19740].project_name
+
+
+def test_post_batch_returns_errors_instead_of_raising(core):
+    results = core.post_batch([("API.NotACommand", {}), ("API.IsAlive", None)])
+    assert isinstance(results[0], APIResponseError)
+    assert results[0].message == "Unknown command: API.NotACommand"
+    assert results[1]["succeeded"]
+
+
+def test_post_batch_returns_tapir_errors(core, server, monkeypatch):
+    monkeypatch.setitem(
+        server[19740]._tapir_commands, "FailingCommand", lambda _: {"error": {"code": 5, "message": "Failed"}}
+    )
+    results = core.post_batch([("FailingCommand", None), ("GetProjectInfo", None)])
+    assert results[0] == APIResponseError(code=5, message="Failed")
+    assert results[1]["succeeded"]
+
+
+def test_post_batch_on_closed_port():
+    core = CoreCommands(Port(19744))
+    results = core.post_batch([("API.IsAlive", None)])
+    core.close()
+    assert isinstance(results[0], APIResponseError)
+    assert results[0].code == TRANSPORT_ERROR_CODE
+
+
+# Tests for serializers
+
+
+@pytest.mark.parametrize("name", available_serializers())
+def test_serializer_round_trip(name):
+    serializer = get_serializer(name)
+    payload = {"elements": [{"elementId": {"guid": "7c1d2b7e-0000-0000-0000-000000000000"}}], "name": "Épület"}
+    assert serializer.decode(serializer.encode(payload)) == payload
+
+
+@pytest.mark.parametrize("name", available_serializers())
+def test_serializer_decode_error_is_value_error(name):
+    with pytest.raises(ValueError):
+        get_serializer(name).decode(b"{not json")
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
+
+
+@pytest.mark.parametrize("name", available_serializers())
+def test_post_command_with_serializer(server, name):
+    core = CoreCommands(Port(19740), serializer=get_serializer(name))
+    try:
+        result = core.post_tapir_command("GetAllElements")
+        assert len(result["result"]["addOnCommandResponse"]["elements"]) == server[19740].element_count
+    finally:
+        core.close()
+
+
+# Tests for streamed responses
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_stream_tapir_command(server):
+    core = CoreCommands(Port(19740))
+    try:
+        expected = core.post_tapir_command("GetAllElements")["result"]["addOnCommandResponse"]["elements"]
+        streamed = asyncio.run(collect(core.stream_tapir_command("GetAllElements", items="elements", chunk_size=64)))
+        assert streamed == expected
+    finally:
+        core.close()
+
+
+def test_stream_command_error(server):
+    core = CoreCommands(Port(19740))
+    try:
+        with pytest.raises(CommandFailedError) as error:
+            asyncio.run(collect(core.stream_command("API.Unknown", items="elements")))
+        assert error.value.code == 2
+        with pytest.raises(CommandFailedError):
+            asyncio.run(collect(core.stream_command("API.GetProductInfo", items="elements")))
+    finally:
+        core.close()
+
+
+def test_json_array_stream_byte_by_byte():
+    document = {
+        "succeeded": True,
+        "result": {"other": [{"elements": [0]}], "elements": [1, 2.5, 'a,]}"', None, [3, [4]], {"b": "é"}]},
+    }
+    stream = JsonArrayStream(("result", "elements"))
+    items = []
+    for byte in json.dumps(document, ensure_ascii=False).encode():
+        items += stream.feed(bytes([byte]))
+    assert items == document["result"]["elements"]
+    assert stream.close() == {"succeeded": True, "result": {"other": [{"elements": [0]}], "elements": []}}
+
+
+def test_json_array_stream_incomplete():
+    stream = JsonArrayStream(("elements",))
+    stream.feed(b'{"elements": [1, 2')
+    with pytest.raises(ValueError):
+        stream.close()
+
+
+# Tests for chunked commands
+
+
+def test_post_chunked_merges_results_in_order(core, server):
+    elements = [{"elementId": {"guid": str(i)}} for i in range(25)]
+    before = server[19740].requests["GetPropertyValuesOfElements"]
+    result = core.post_chunked("GetPropertyValuesOfElements", {"elements": elements, "properties": [{}]}, chunk_size=10)
+    assert server[19740].requests["GetPropertyValuesOfElements"] - before == 3
+    assert result["succeeded"]
+    assert len(result["result"]["addOnCommandResponse"]["propertyValuesForElements"]) == 25
+
+
+def test_post_chunked_single_chunk(core, server):
+    before = server[19740].requests["API.SetPropertyValuesOfElements"]
+    result = core.post_chunked("API.SetPropertyValuesOfElements", {"elementPropertyValues": [{}] * 5})
+    assert server[19740].requests["API.SetPropertyValuesOfElements"] - before == 1
+    assert result == {"succeeded": True, "result": {"executionResults": [{"success": True}] * 5}}
+
+
+def test_post_chunked_validates_parameters(core):
+    highlight = ChunkedCommand(("elements", "highlightedColors"))
+    with pytest.raises(ValueError):
+        core.post_chunked("ColorElements", {"elements": [{}] * 3, "highlightedColors": [[0, 0, 0, 0]]}, 2, highlight)
+    with pytest.raises(ValueError):
+        core.post_chunked("UnknownCommand", {"elements": []})
+
+
+def test_highlight_elements_is_not_chunked(core):
+    with pytest.raises(ValueError):
+        core.post_chunked("HighlightElements", {"elements": [{}] * 3, "highlightedColors": [[0, 0, 0, 0]] * 3})
+
+
+def test_post_chunked_stops_after_failed_chunk(core, server):
+    server[19740].error_rate = 1.0
+    try:
+        before = server[19740].requests["SetPropertyValuesOfElements"]
+        result = core.post_chunked("SetPropertyValuesOfElements", {"elementPropertyValues": [{}] * 30}, chunk_size=10)
+        assert not result["succeeded"]
+        assert server[19740].requests["SetPropertyValuesOfElements"] - before == 1
+    finally:
+        server[19740].error_rate = 0.0
+
+
+# Tests for timeouts, retries and the circuit breaker
+
+
+@pytest.fixture
+def slow_server(server):
+    """Make the mock instance answer slower than the timeouts of the tests. Requests are not serialized, so each
+    of them is counted as soon as it arrives."""
+    server[19740].latency, server[19740].serial = 0.2, False
+    yield server
+    server[19740].latency, server[19740].serial = 0.0, True
+
+
+def test_idempotent_command_is_retried_after_timeout(slow_server):
+    core = CoreCommands(Port(19740), request_policy=RequestPolicy(timeout=0.05, retries=1, backoff=0.0))
+    before = slow_server[19740].requests["GetAllElements"]
+    try:
+        with pytest.raises(TimeoutError):
+            core.post_tapir_command("GetAllElements")
+        assert slow_server[19740].requests["GetAllElements"] - before == 2
+    finally:
+        core.close()
+
+
+def test_command_that_modifies_the_project_is_not_retried_after_timeout(slow_server):
+    core = CoreCommands(Port(19740), request_policy=RequestPolicy(timeout=0.05, retries=1, backoff=0.0))
+    before = slow_server[19740].requests["SetPropertyValuesOfElements"]
+    try:
+        with pytest.raises(TimeoutError):
+            core.post_tapir_command("SetPropertyValuesOfElements", {"elementPropertyValues": []})
+        assert slow_server[19740].requests["SetPropertyValuesOfElements"] - before == 1
+    finally:
+        core.close()
+
+
+def test_command_timeouts_override_the_default(slow_server):
+    policy = RequestPolicy(timeout=0.05, command_timeouts={"GetProjectInfo": 5.0}, retries=0)
+    core = CoreCommands(Port(19740), request_policy=policy)
+    try:
+        assert core.post_tapir_command("GetProjectInfo")["succeeded"]
+    finally:
+        core.close()
+
+
+def test_circuit_opens_after_consecutive_failures():
+    policy = RequestPolicy(retries=0, failure_threshold=2, reset_timeout=0.2)
+    core = CoreCommands(Port(19744), request_policy=policy)
+    try:
+        for _ in range(2):
+            with pytest.raises(Exception) as error:
+                core.post_command("API.IsAlive")
+            assert not isinstance(error.value, CircuitOpenError)
+        assert core.circuit_breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError):
+            core.post_command("API.IsAlive")
+        assert core.post_batch([("API.IsAlive", None)])[0].code == TRANSPORT_ERROR_CODE
+    finally:
+        core.close()
+
+
+def test_circuit_closes_after_successful_trial(server):
+    core = CoreCommands(Port(19740), request_policy=RequestPolicy(failure_threshold=1, reset_timeout=0.05))
+    try:
+        core.circuit_breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            core.post_command("API.IsAlive")
+        asyncio.run(asyncio.sleep(0.06))
+        assert core.post_command("API.IsAlive")["succeeded"]
+        assert core.circuit_breaker.state == CircuitState.CLOSED
+    finally:
+        core.close()
@@ -0,0 +1,92 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from multiconn_archicad import ConnHeader, CoreCommands, Port
+from multiconn_archicad.core_commands import RequestPolicy
+from multiconn_archicad.hooks import RequestHooks
+from multiconn_archicad.utilities.async_utils import run_async
+
+
+@pytest.fixture
+def mock_options():
+    return {"element_count": 3}
+
+
+def test_sync_and_async_hooks_around_core_commands(server):
+    hooks = RequestHooks()
+    calls = []
+    hooks.add_before(lambda info: calls.append(("before", info.command, info.port)))
+
+    @hooks.add_after
+    async def after(info, result):
+        await asyncio.sleep(0)
+        calls.append(("after", info.command, info.request_bytes > 0, info.duration > 0, result["succeeded"]))
+
+    core = CoreCommands(Port(19739), hooks=hooks)
+    try:
+        core.post_tapir_command("GetProjectInfo")
+    finally:
+        core.close()
+    assert calls == [("before", "GetProjectInfo", Port(19739)), ("after", "GetProjectInfo", True, True, True)]
+
+
+def test_error_hook_receives_the_exception():
+    hooks = RequestHooks()
+    errors = []
+    hooks.add_error(lambda info, error: errors.append((info.command, type(error))))
+    core = CoreCommands(Port(19744), hooks=hooks, request_policy=RequestPolicy(retries=0))
+    try:
+        with pytest.raises(aiohttp.ClientConnectorError):
+            core.post_command("API.IsAlive")
+    finally:
+        core.close()
+    assert errors == [("API.IsAlive", aiohttp.ClientConnectorError)]
+
+
+def test_hooks_around_standard_commands(server):
+    header = ConnHeader(Port(19739))
+    try:
+        header.connect()
+        commands = []
+        header.hooks.add_after(lambda info, result: commands.append((info.command, info.request_bytes)))
+        elements = header.standard.commands.GetAllElements()
+        header.hooks.clear()
+        header.standard.commands.GetAllElements()
+    finally:
+        header.core.close()
+    assert len(elements) == 3
+    assert commands == [("API.GetAllElements", None)]
+
+
+def test_async_hooks_of_standard_commands_on_the_runtime_loop(server, caplog):
+    header = ConnHeader(Port(19739))
+    calls = []
+
+    @header.hooks.add_before
+    async def before(info):
+        calls.append(("before", info.command))
+
+    @header.hooks.add_after
+    async def after(info, result):
+        calls.append(("after", info.command))
+        raise ValueError("hook failed")
+
+    async def elements():
+        return header.standard.commands.GetAllElements()
+
+    async def hooks_called():
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+
+    try:
+        header.connect()
+        # the coroutine runs on the runtime thread, like the coroutines passed to run_on from sync code
+        assert len(run_async(elements())) == 3
+        run_async(asyncio.wait_for(hooks_called(), 5))
+    finally:
+        header.core.close()
+    assert calls == [("before", "API.GetAllElements"), ("after", "API.GetAllElements")]
+    assert any("hook failed" in record.getMessage() for record in caplog.records)
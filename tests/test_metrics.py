@@ -0,0 +1,63 @@
+import urllib.request
+
+import pytest
+
+from multiconn_archicad import Port
+from multiconn_archicad.metrics import Histogram, MetricsRegistry, MetricsServer
+
+
+@pytest.fixture
+def registry():
+    """Create an enabled registry, separate from the one of the process."""
+    registry = MetricsRegistry()
+    registry.enable()
+    return registry
+
+
+@pytest.fixture
+def core_options(registry):
+    return {"metrics": registry}
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_disabled_registry_records_nothing(core, registry):
+    registry.disable()
+    core.post_command("API.IsAlive")
+    assert registry.snapshot().commands == {}
+
+
+def test_requests_are_recorded_per_port_and_command(core, registry):
+    core.post_command("API.IsAlive")
+    core.post_tapir_command("GetProjectInfo")
+    core.post_tapir_command("GetProjectInfo")
+    core.post_command("API.NoSuchCommand")
+    snapshot = registry.snapshot()
+    project_info = snapshot.commands[(Port(19739), "GetProjectInfo")]
+    assert project_info.requests == project_info.latency.count == project_info.decode.count == 2
+    assert project_info.request_bytes > 0 and project_info.response_bytes > 0
+    assert snapshot.commands[(Port(19739), "API.NoSuchCommand")].error_codes == {2: 1}
+    assert snapshot.in_flight == {Port(19739): 0}
+
+
+def test_prometheus_export_and_endpoint(core, registry):
+    core.post_command("API.IsAlive")
+    text = registry.to_prometheus()
+    assert 'multiconn_requests_total{port="19739",command="API.IsAlive"} 1' in text
+    assert 'multiconn_request_duration_seconds_bucket{port="19739",command="API.IsAlive",le="+Inf"} 1' in text
+
+    server = MetricsServer(registry, port=19738)
+    server.start()
+    try:
+        with urllib.request.urlopen("http://127.0.0.1:19738/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'command="API.IsAlive"' in response.read().decode()
+    finally:
+        server.stop()
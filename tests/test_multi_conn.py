@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from multiconn_archicad import ConnHeader, MultiConn, Port, ProductInfo, ScanDiff, SoloProjectID
+from multiconn_archicad.testing import MockArchicad, MockArchicadServer
+
+
+@pytest.fixture
+def server():
+    """Serve two mock Archicad instances with different projects."""
+    instances = [
+        MockArchicad(Port(19741), project_name="First"),
+        MockArchicad(Port(19742), project_name="Second"),
+    ]
+    with MockArchicadServer(instances) as server:
+        yield server
+
+
+@pytest.fixture
+def conn(server):
+    """Create a MultiConn that sees the mock instances."""
+    with MultiConn() as conn:
+        yield conn
+
+
+# Tests for scanning
+
+
+def test_open_ports_are_found(conn):
+    assert conn.open_ports == [Port(19741), Port(19742)]
+    assert conn.primary.port == Port(19741)
+
+
+def test_primary_is_the_open_port_header(conn, server):
+    server[19742].requests.clear()
+    conn.primary = Port(19742)
+    assert conn.primary is conn.open_port_headers[Port(19742)]
+    assert conn.core is conn.primary.core
+    assert conn.standard.commands.IsAlive()
+    assert server[19742].requests == {"API.IsAlive": 1}
+
+
+def test_refresh_keeps_headers_with_open_circuit(conn):
+    header = conn.open_port_headers[Port(19741)]
+    for _ in range(header.core.circuit_breaker.failure_threshold):
+        header.core.circuit_breaker.record_failure()
+    assert conn.refresh.all_ports() == ScanDiff()
+    assert conn.open_port_headers[Port(19741)] is header
+
+
+def test_connected_instances_of_a_build_share_the_release(conn):
+    conn.connect.all()
+    first, second = (conn.open_port_headers[port].standard for port in conn.open_ports)
+    assert first.types is second.types
+    assert type(first.commands) is type(second.commands)
+    assert first.commands is not second.commands
+    assert second.utilities.accommands is second.commands
+
+
+def test_refresh_is_logged_with_fields(conn, caplog):
+    with caplog.at_level(logging.DEBUG, logger="multiconn_archicad"), MockArchicadServer(ports=[19743]):
+        conn.refresh.all_ports()
+    opened = next(record for record in caplog.records if getattr(record, "event", None) == "opened")
+    assert opened.port == Port(19743)
+    refreshed = next(record for record in caplog.records if record.name == "multiconn_archicad.actions.refresh")
+    assert refreshed.open_ports == [Port(19741), Port(19742), Port(19743)]
+    assert refreshed.duration > 0
+
+
+# Tests for the concurrent initialization of headers
+
+
+def test_headers_are_initialized(conn):
+    header = conn.open_port_headers[Port(19742)]
+    assert header.product_info == ProductInfo(version=27, build=3001, lang="INT")
+    assert header.archicad_id == SoloProjectID(projectPath="C:\\Projects\\MockProject.pln", projectName="Second")
+    assert header.timings.total >= header.timings.product_info > 0
+
+
+# Tests for closing headers
+
+
+def test_disconnect_in_async_code_keeps_the_close_task(server):
+    async def main():
+        header = await ConnHeader.async_init(Port(19741))
+        session = await header.core.get_session()
+        header.disconnect()
+        closing = set(header._closing)
+        await header.close()
+        return session, closing, header._closing
+
+    session, closing, remaining = asyncio.run(main())
+    assert session.closed
+    assert len(closing) == 1
+    assert all(task.done() for task in closing)
+    assert remaining == set()
+
+
+# Tests for incremental scanning
+
+
+def test_incremental_refresh_without_changes(conn, server):
+    server[19741].requests.clear()
+    diff = conn.refresh.all_ports(incremental=True)
+    assert diff == ScanDiff()
+    assert "GetArchicadLocation" not in server[19741].requests
+
+
+def test_incremental_refresh_detects_project_change(conn, server):
+    server[19742].project_name = "Renamed"
+    diff = conn.refresh.all_ports(incremental=True)
+    assert diff == ScanDiff(changed=[Port(19742)])
+    assert conn.open_port_headers[Port(19742)].archicad_id.projectName == "Renamed"
+
+
+def test_refresh_detects_opened_and_closed_ports(conn):
+    with MockArchicadServer(ports=[19743]):
+        assert conn.refresh.all_ports() == ScanDiff(opened=[Port(19743)])
+    assert conn.refresh.all_ports(incremental=True) == ScanDiff(closed=[Port(19743)])
+
+
+# Tests for lazy construction
+
+
+def test_lazy_conn_scans_on_first_access(server):
+    with MultiConn(lazy=True) as conn:
+        assert conn._open_port_headers == {}
+        assert conn.primary.port == Port(19741)
+        assert conn.open_ports == [Port(19741), Port(19742)]
+
+
+def test_lazy_conn_scans_the_chosen_primary_first(server):
+    with MultiConn(lazy=True) as conn:
+        conn.primary = Port(19742)
+        assert list(conn._open_port_headers) == [Port(19742)]
+        assert conn.primary.port == Port(19742)
+        assert conn.open_ports == [Port(19741), Port(19742)]
+        assert conn.primary is conn.open_port_headers[Port(19742)]
+        assert conn.core is conn.primary.core
+
+
+def test_lazy_conn_scans_before_batches_and_run_on(server):
+    with MultiConn(lazy=True) as conn:
+        assert list(conn.post_batch([("API.IsAlive", None)])) == [Port(19741), Port(19742)]
+    with MultiConn(lazy=True) as conn:
+        assert conn.run_on.all(lambda header: header.port) == {Port(19741): Port(19741), Port(19742): Port(19742)}
+    with MultiConn(lazy=True) as conn:
+        assert list(conn.run_on.from_ports([Port(19742)], lambda header: header.port)) == [Port(19742)]
+    with MultiConn(lazy=True) as conn:
+        conn.connect.from_ports(Port(19741))
+        assert conn.run_on.active(lambda header: header.port) == {Port(19741): Port(19741)}
+
+
+def test_concurrent_readers_share_the_first_scan(server):
+    with MultiConn(lazy=True) as conn, ThreadPoolExecutor(3) as executor:
+        batches = list(executor.map(lambda _: conn.post_batch([("API.IsAlive", None)]), range(3)))
+        assert [list(batch) for batch in batches] == [[Port(19741), Port(19742)]] * 3
+        assert server[19741].requests["API.GetProductInfo"] == 1
+
+
+def test_create_scans_without_blocking_the_loop(server):
+    async def main():
+        async with await MultiConn.create() as conn:
+            return conn.open_ports, conn.primary.port
+
+    assert asyncio.run(main()) == ([Port(19741), Port(19742)], Port(19741))
+
+
+# Tests for batches
+
+
+def test_post_batch_on_all_instances(conn):
+    results = conn.post_batch([("GetProjectInfo", None)])
+    assert {port: result[0]["result"]["addOnCommandResponse"]["projectName"] for port, result in results.items()} == {
+        Port(19741): "First",
+        Port(19742): "Second",
+    }
+
+
+# Tests for run_on
+
+
+def test_run_on_all_instances(conn):
+    def project_name(header):
+        return header.core.post_tapir_command("GetProjectInfo")["result"]["addOnCommandResponse"]["projectName"]
+
+    assert conn.run_on.all(project_name) == {Port(19741): "First", Port(19742): "Second"}
+
+
+def test_run_on_reports_timeouts_and_exceptions(conn):
+    def slow_or_failing(header):
+        if header.port == Port(19741):
+            time.sleep(0.5)
+        raise ValueError("failed")
+
+    results = conn.run_on.all(slow_or_failing, timeout=0.1)
+    assert isinstance(results[Port(19741)], TimeoutError)
+    assert isinstance(results[Port(19742)], ValueError)
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+from multiconn_archicad import ConnHeader, DialogHandlerBase, MultiConn, Port, UnhandledDialogError
+from multiconn_archicad.actions import project_handler
+from multiconn_archicad.basic_types import APIResponseError
+from multiconn_archicad.errors import NotFullyInitializedError, PortDiscoveryTimeoutError, ProjectAlreadyOpenError
+from multiconn_archicad.testing import MockArchicad, MockArchicadServer
+
+
+class FakeProcess:
+    """Stands in for psutil.Process, and starts listening on port after listen_after polls of its connections."""
+
+    def __init__(self, port: int | None = None, listen_after: int = 1) -> None:
+        self.port = port
+        self.listen_after = listen_after
+        self.polls = 0
+
+    def net_connections(self, kind: str) -> list[SimpleNamespace]:
+        self.polls += 1
+        connections = [
+            SimpleNamespace(status=psutil.CONN_LISTEN, laddr=SimpleNamespace(port=8080)),
+            SimpleNamespace(status=psutil.CONN_ESTABLISHED, laddr=SimpleNamespace(port=19736)),
+        ]
+        if self.port is not None and self.polls >= self.listen_after:
+            connections.append(SimpleNamespace(status=psutil.CONN_LISTEN, laddr=SimpleNamespace(port=self.port)))
+        return connections
+
+
+@pytest.fixture
+def open_project():
+    """Create the OpenProject action of a MultiConn that does not scan the ports."""
+    with MultiConn(lazy=True) as conn:
+        conn.open_project.min_poll_interval = 0.001
+        conn.open_project.max_poll_interval = 0.004
+        yield conn.open_project
+
+
+# Tests for port discovery
+
+
+def test_poll_intervals_back_off_until_the_deadline(open_project):
+    open_project.min_poll_interval, open_project.max_poll_interval = 0.05, 0.2
+    intervals = list(itertools.islice(open_project._poll_intervals(time.monotonic() + 60), 5))
+    assert intervals == [0.05, 0.1, 0.2, 0.2, 0.2]
+    assert list(open_project._poll_intervals(time.monotonic() - 1)) == [0.0]
+
+
+def test_port_is_discovered_when_the_process_listens(open_project, monkeypatch):
+    process = FakeProcess(port=19735, listen_after=3)
+    monkeypatch.setattr(psutil, "Process", lambda pid: process)
+    port, metrics = asyncio.run(open_project._discover_port(SimpleNamespace(pid=42), time.perf_counter()))
+    assert port == Port(19735)
+    assert (metrics.pid, metrics.port, metrics.polls) == (42, Port(19735), 3)
+    assert metrics.time_to_listen > 0
+
+
+def test_discovery_stops_at_the_deadline(open_project, monkeypatch):
+    process = FakeProcess()
+    monkeypatch.setattr(psutil, "Process", lambda pid: process)
+    open_project.discovery_timeout = 0.05
+    start = time.monotonic()
+    with pytest.raises(PortDiscoveryTimeoutError):
+        asyncio.run(open_project._discover_port(SimpleNamespace(pid=42), time.perf_counter()))
+    assert time.monotonic() - start < 1.0
+    assert process.polls >= 2
+
+
+# Tests for opening several projects
+
+
+class FakeDialogHandler(DialogHandlerBase):
+    """Records the processes it handles and the threads it runs on, and fails for the processes of failing_pids."""
+
+    def __init__(self, failing_pids: set[int]) -> None:
+        self.failing_pids = failing_pids
+        self.handled: list[tuple[int, threading.Thread]] = []
+
+    def start(self, process) -> None:
+        self.handled.append((process.pid, threading.current_thread()))
+        if process.pid in self.failing_pids:
+            raise UnhandledDialogError("Unable to handle dialogs")
+
+
+PROJECTS = {"First": (1, 19735), "Second": (2, 19736), "Broken": (3, None)}
+
+
+@pytest.fixture
+def headers():
+    """Headers of saved projects, read from mock instances that are closed before the test."""
+    instances = [
+        MockArchicad(Port(port), project_name=name, project_path=f"C:\\Projects\\{name}.pln")
+        for port, name in zip((19741, 19742, 19743), PROJECTS)
+    ]
+    with MockArchicadServer(instances):
+        headers = [ConnHeader(instance.port) for instance in instances]
+    for header in headers:
+        header.core.close()
+    return headers
+
+
+def test_projects_are_opened_with_their_own_ports(headers, monkeypatch):
+    def popen(command, **kwargs):
+        return next(SimpleNamespace(pid=pid) for name, (pid, _) in PROJECTS.items() if f"{name}.pln" in command)
+
+    processes = {pid: FakeProcess(port=port, listen_after=2) for pid, port in PROJECTS.values()}
+    monkeypatch.setattr(project_handler, "subprocess", SimpleNamespace(Popen=popen))
+    monkeypatch.setattr(psutil, "Process", lambda pid: processes[pid])
+    dialog_handler = FakeDialogHandler(failing_pids={3})
+    ports = [Port(port) for _, port in PROJECTS.values() if port]
+    with MultiConn(dialog_handler=dialog_handler, lazy=True) as conn:
+        conn.open_project.min_poll_interval = 0.001
+        with MockArchicadServer(ports=ports):
+            results = conn.open_project.from_headers(*headers, max_concurrency=2)
+            assert [header.port for header in conn.open_port_headers.values()] == ports
+        assert not hasattr(conn.open_project, "process")
+        assert {metrics.pid for metrics in conn.open_project.launch_metrics} == {1, 2}
+
+    assert [(header, port) for header, port in results[:2]] == list(zip(headers[:2], ports))
+    assert results[2][0] is headers[2]
+    assert isinstance(results[2][1], UnhandledDialogError)
+    # the dialogs are handled in launch order, in the calling thread
+    assert dialog_handler.handled == [
+        (1, threading.current_thread()),
+        (2, threading.current_thread()),
+        (3, threading.current_thread()),
+    ]
+
+
+def test_launches_hold_their_slot_until_the_port_is_discovered(headers, monkeypatch):
+    discovered_at_launch = []
+
+    def popen(command, **kwargs):
+        discovered_at_launch.append(len(conn.open_project.launch_metrics))
+        return next(SimpleNamespace(pid=pid) for name, (pid, _) in PROJECTS.items() if f"{name}.pln" in command)
+
+    processes = {pid: FakeProcess(port=port, listen_after=5) for pid, port in PROJECTS.values()}
+    monkeypatch.setattr(project_handler, "subprocess", SimpleNamespace(Popen=popen))
+    monkeypatch.setattr(psutil, "Process", lambda pid: processes[pid])
+    ports = [Port(19735), Port(19736)]
+    with MultiConn(dialog_handler=FakeDialogHandler(set()), lazy=True) as conn, MockArchicadServer(ports=ports):
+        conn.open_project.min_poll_interval = 0.001
+        results = conn.open_project.from_headers(*headers[:2], max_concurrency=1)
+        with pytest.raises(ValueError):
+            conn.open_project.from_headers(*headers[:2], max_concurrency=0)
+    assert discovered_at_launch == [0, 1]
+    assert [port for _, port in results] == ports
+
+
+def test_open_projects_are_reported_per_header(headers, monkeypatch):
+    monkeypatch.setattr(project_handler, "subprocess", SimpleNamespace(Popen=lambda command, **kwargs: None))
+    first = MockArchicad(Port(19741), project_name="First", project_path="C:\\Projects\\First.pln")
+    with MockArchicadServer([first]), MultiConn(dialog_handler=FakeDialogHandler(set())) as conn:
+        unknown = ConnHeader.from_dict(headers[1].to_dict())
+        unknown.archicad_id = APIResponseError(code=-1, message="The project could not be read")
+        results = conn.open_project.from_headers(headers[0], unknown)
+        unknown.core.close()
+    assert isinstance(results[0][1], ProjectAlreadyOpenError)
+    assert isinstance(results[1][1], NotFullyInitializedError)
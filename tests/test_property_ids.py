@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from multiconn_archicad import ConnHeader, Port, ProductInfo, PropertyIdResolver
+from multiconn_archicad.errors import CommandFailedError, NotFullyInitializedError
+
+
+@pytest.fixture
+def ports():
+    """Two mock Archicad instances of the same version and build."""
+    return [19738, 19739]
+
+
+async def resolve_on_both(resolver, *names):
+    headers = [await ConnHeader.async_init(Port(port)) for port in (19738, 19739)]
+    try:
+        return await asyncio.gather(*(resolver.resolve(header, *names) for header in headers))
+    finally:
+        for header in headers:
+            await header.core.close()
+
+
+def test_ids_are_requested_once_per_version_and_build(server):
+    resolver = PropertyIdResolver()
+    first, second = asyncio.run(resolve_on_both(resolver, "General_ElementID", "General_Height"))
+    assert first == second
+    assert sum(server[port].requests["API.GetPropertyIds"] for port in (19738, 19739)) == 1
+    server[19739].build = 3002
+    asyncio.run(resolve_on_both(resolver, "General_ElementID"))
+    assert sum(server[port].requests["API.GetPropertyIds"] for port in (19738, 19739)) == 2
+
+
+def test_ids_are_persisted(server, tmp_path):
+    path = tmp_path / "property_ids.json"
+    first = asyncio.run(resolve_on_both(PropertyIdResolver(path), "General_ElementID"))
+    assert json.loads(path.read_text()) == {"27.3001": first[0]}
+    requests = sum(server[port].requests["API.GetPropertyIds"] for port in (19738, 19739))
+    assert asyncio.run(resolve_on_both(PropertyIdResolver(path), "General_ElementID")) == first
+    assert sum(server[port].requests["API.GetPropertyIds"] for port in (19738, 19739)) == requests
+
+
+def test_uninitialized_header_is_rejected():
+    header = ConnHeader(Port(19743), initialize=False)
+    with pytest.raises(NotFullyInitializedError):
+        PropertyIdResolver().resolve(header, "General_ElementID")
+
+
+def test_names_missing_from_the_response_fail(server, monkeypatch):
+    get_property_ids = server[19738].get_property_ids
+    monkeypatch.setitem(
+        server[19738]._official_commands,
+        "API.GetPropertyIds",
+        lambda parameters: {"properties": get_property_ids(parameters)["properties"][:1]},
+    )
+
+    async def main(resolver):
+        header = await ConnHeader.async_init(Port(19738))
+        try:
+            with pytest.raises(CommandFailedError, match="General_Height"):
+                await resolver.resolve(header, "General_ElementID", "General_Height")
+        finally:
+            await header.core.close()
+
+    resolver = PropertyIdResolver()
+    asyncio.run(main(resolver))
+    assert list(resolver.cached(ProductInfo(version=27, build=3001, lang="INT"))) == ["General_ElementID"]
+    assert resolver._pending == {}
+
+
+def test_names_of_a_cancelled_lookup_are_requested_again(server):
+    async def main(resolver):
+        headers = [await ConnHeader.async_init(Port(port)) for port in (19738, 19739)]
+        server[19738].latency = 1.0
+        try:
+            cancelled = resolver.resolve(headers[0], "General_ElementID")
+            await asyncio.sleep(0.1)
+            waiting = resolver.resolve(headers[1], "General_ElementID")
+            await asyncio.sleep(0.1)
+            cancelled.cancel()
+            return await asyncio.wait_for(waiting, 5)
+        finally:
+            for header in headers:
+                await header.core.close()
+
+    resolver = PropertyIdResolver()
+    assert list(asyncio.run(main(resolver))) == ["General_ElementID"]
+    assert server[19739].requests["API.GetPropertyIds"] == 1
+    assert resolver._pending == {}
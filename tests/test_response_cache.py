@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from multiconn_archicad import ConnHeader, CoreCommands, Port, RequestPolicy
+from multiconn_archicad.response_cache import CachePolicy, ResponseCache
+
+
+@pytest.fixture
+def core_options():
+    return {"cache_policy": CachePolicy()}
+
+
+def test_entries_expire_and_are_evicted_by_recent_use():
+    cache = ResponseCache(CachePolicy(ttl=0.05, max_entries=2))
+    cache.put(("a", ""), b"1")
+    cache.put(("b", ""), b"2")
+    assert cache.get(("a", "")) == b"1"
+    cache.put(("c", ""), b"3")
+    assert cache.get(("b", "")) is None
+    time.sleep(0.06)
+    assert cache.get(("a", "")) is None
+    assert cache.stats.evictions == 1
+
+
+def test_parameters_are_canonicalized():
+    assert ResponseCache.key("GetPropertyIds", {"a": 1, "b": 2}) == ResponseCache.key(
+        "GetPropertyIds", {"b": 2, "a": 1}
+    )
+
+
+def test_read_only_responses_are_cached(core, server):
+    first = core.post_tapir_command("GetProjectInfo")
+    first["result"] = None
+    second = core.post_tapir_command("GetProjectInfo")
+    assert second["result"]["addOnCommandResponse"]["projectName"] == server[19739].project_name
+    assert server[19739].requests["GetProjectInfo"] == 1
+    core.post_tapir_command("GetProjectInfo", fresh=True)
+    assert server[19739].requests["GetProjectInfo"] == 2
+    core.post_command("API.IsAlive")
+    assert len(core.cache) == 1
+
+
+def test_write_commands_clear_the_cache(core, server):
+    core.post_tapir_command("GetProjectInfo")
+    core.post_tapir_command("SetPropertyValuesOfElements", {"elementPropertyValues": []})
+    assert len(core.cache) == 0
+    core.post_tapir_command("GetProjectInfo")
+    assert server[19739].requests["GetProjectInfo"] == 2
+
+
+def test_timed_out_write_commands_clear_the_cache(server):
+    policy = RequestPolicy(command_timeouts={"SetPropertyValuesOfElements": 0.05})
+    core = CoreCommands(Port(19739), request_policy=policy, cache_policy=CachePolicy())
+    try:
+        core.post_tapir_command("GetProjectInfo")
+        server[19739].latency = 0.2
+        with pytest.raises(TimeoutError):
+            core.post_tapir_command("SetPropertyValuesOfElements", {"elementPropertyValues": []})
+        assert len(core.cache) == 0
+    finally:
+        core.close()
+
+
+def test_project_change_clears_the_cache(server):
+    async def main():
+        header = await ConnHeader.async_init(Port(19739), cache_policy=CachePolicy())
+        try:
+            await header.core.post_tapir_command("GetProjectInfo")
+            server[19739].project_name = "Renamed"
+            changed = await header.refresh_if_changed()
+            result = await header.core.post_tapir_command("GetProjectInfo")
+            return (
+                changed,
+                result["result"]["addOnCommandResponse"]["projectName"],
+                header.core.cache.stats.invalidations,
+            )
+        finally:
+            await header.core.close()
+
+    assert asyncio.run(main()) == (True, "Renamed", 1)
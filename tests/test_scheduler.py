@@ -0,0 +1,79 @@
+import asyncio
+
+from multiconn_archicad import ConnHeader, Port
+from multiconn_archicad.scheduler import Priority, RequestScheduler
+
+
+def test_limits_requests_in_flight():
+    scheduler = RequestScheduler(max_in_flight=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with scheduler.slot():
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.metrics.requests == 10
+    assert scheduler.metrics.queued == 8
+    assert scheduler.metrics.max_queue_depth == 8
+
+
+def test_waiting_requests_are_let_in_by_priority():
+    scheduler = RequestScheduler(max_in_flight=1)
+    order = []
+
+    async def request(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    async def main():
+        await scheduler.acquire()
+        tasks = [
+            asyncio.create_task(request("low", Priority.LOW)),
+            asyncio.create_task(request("normal", Priority.NORMAL)),
+            asyncio.create_task(request("high", Priority.HIGH)),
+            asyncio.create_task(request("normal 2", Priority.NORMAL)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 4
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["high", "normal", "normal 2", "low"]
+
+
+def test_cancelled_waiter_does_not_keep_the_slot():
+    scheduler = RequestScheduler(max_in_flight=1)
+
+    async def main():
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.wait_for(scheduler.acquire(), 1)
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0
+    assert scheduler.queue_depth == 0
+
+
+def test_header_requests_go_through_the_scheduler(server):
+    header = ConnHeader(Port(19739))
+    try:
+        assert header.core.scheduler is header.scheduler
+        assert header.scheduler.metrics.requests_by_priority[Priority.HIGH] == 3
+        header.core.post_command("API.IsAlive")
+        assert header.scheduler.metrics.requests_by_priority[Priority.NORMAL] == 1
+    finally:
+        header.core.close()
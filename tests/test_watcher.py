@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from multiconn_archicad import MultiConn, Port, PortEvent, PortEventType
+from multiconn_archicad.testing import MockArchicadServer
+
+
+@pytest.fixture
+def ports():
+    """The port of the mock instance the watcher sees from the start."""
+    return [19741]
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def kinds(events):
+    return [(event.type, event.port) for event in events]
+
+
+def test_callbacks_receive_events_from_the_runtime_loop(server, caplog):
+    events: list[PortEvent] = []
+    intervals = []
+
+    def failing(event):
+        raise ValueError("callback failed")
+
+    with MultiConn() as conn:
+        watcher = conn.watcher
+        watcher.subscribe(failing)
+        watcher.subscribe(lambda event: (events.append(event), intervals.append(watcher.interval)))
+        conn.watch(min_interval=0.01, max_interval=0.05)
+        assert wait_for(lambda: watcher.interval == 0.05)
+        with MockArchicadServer(ports=[19743]):
+            assert wait_for(lambda: len(events) == 1)
+            server[19741].project_name = "Renamed"
+            assert wait_for(lambda: len(events) == 2)
+        assert wait_for(lambda: len(events) == 3)
+        watcher.stop()
+        assert not watcher.running
+
+    assert kinds(events) == [
+        (PortEventType.OPENED, Port(19743)),
+        (PortEventType.CHANGED, Port(19741)),
+        (PortEventType.CLOSED, Port(19743)),
+    ]
+    assert events[0].header.port == Port(19743)
+    assert events[1].header.archicad_id.projectName == "Renamed"
+    assert events[2].header is None
+    # the interval is reset by every change
+    assert intervals == [0.01] * 3
+    assert any("callback failed" in record.getMessage() for record in caplog.records)
+
+
+def test_events_are_iterated_in_async_code(server):
+    async def next_event(events):
+        return await asyncio.wait_for(anext(events), 5)
+
+    async def main():
+        async with await MultiConn.create() as conn:
+            watcher = conn.watch(min_interval=0.01, max_interval=0.05)
+            events = watcher.events()
+            # the iterator subscribes when it is first awaited, so it is started before the first change
+            opened = asyncio.ensure_future(next_event(events))
+            await asyncio.sleep(0)
+            try:
+                async with MockArchicadServer(ports=[19743]):
+                    received = [await opened]
+                    server[19741].project_name = "Renamed"
+                    received.append(await next_event(events))
+                received.append(await next_event(events))
+            finally:
+                watcher.stop()
+                await events.aclose()
+            return received, watcher.running
+
+    received, running = asyncio.run(main())
+    assert kinds(received) == [
+        (PortEventType.OPENED, Port(19743)),
+        (PortEventType.CHANGED, Port(19741)),
+        (PortEventType.CLOSED, Port(19743)),
+    ]
+    assert not running
+
+
+def test_failed_scans_are_logged_and_retried(server, caplog, monkeypatch):
+    with MultiConn() as conn:
+        scan_ports = conn.scan_ports
+        calls = []
+
+        async def failing_once(ports, incremental=False):
+            calls.append(incremental)
+            if len(calls) == 1:
+                raise RuntimeError("scan failed")
+            return await scan_ports(ports, incremental)
+
+        monkeypatch.setattr(conn, "scan_ports", failing_once)
+        with caplog.at_level(logging.WARNING, logger="multiconn_archicad.watcher"):
+            conn.watch(min_interval=0.01, max_interval=0.05)
+            assert wait_for(lambda: len(calls) >= 2)
+            conn.watcher.stop()
+    assert calls[:2] == [True, True]
+    assert any("scan failed" in record.getMessage() for record in caplog.records)